@@ -1,10 +1,19 @@
 from flask import Flask
+import config
 from routes.book_routes import book_routes
 from routes.rating_routes import rating_routes
+from routes.status_routes import status_routes
+from routes.job_routes import job_routes
+from util.summarizer import summarizer
 
 app = Flask(__name__)
 app.register_blueprint(book_routes)
 app.register_blueprint(rating_routes)
+app.register_blueprint(status_routes)
+app.register_blueprint(job_routes)
+
+if config.GEMINI_WARMUP:
+    summarizer.warmup()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8000)
@@ -0,0 +1,74 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.memory_repository import MemoryRepository
+from models.book import Book
+from models.rating import Rating
+
+# GET /books filters, counts and /top over the dict store and indexes versus
+# the NumPy columnar catalog
+
+GENRES = ["Fiction", "Children", "Fantasy", "Science", "Novel", "Science Fiction"]
+LANGUAGES = [["eng"], ["heb"], ["spa"], ["eng", "spa"], ["chi"]]
+QUERIES = {
+    "genre": [("genre", "Fantasy")],
+    "genre_or_language": [("genre", "Fiction,Novel"), ("language", "eng,heb")],
+    "publisher_year": [("publisher", "Publisher 3"), ("publishedDate", "2005")],
+    "title_residual": [("genre", "Science"), ("title", "Title 7")]
+}
+
+
+def populate(size, columnar):
+    store = MemoryRepository(columnar=columnar)
+    random.seed(size)
+    for i in range(1, size + 1):
+        book_id = str(i)
+        store.save_book(
+            Book(book_id, f"isbn-{i}", f"Title {i % 100}", random.choice(GENRES), f"Author {i % 1000}",
+                 f"Publisher {i % 50}", str(1990 + i % 30), random.choice(LANGUAGES), "summary"),
+            Rating(book_id, f"Title {i}")
+        )
+    for rating in list(store.all_ratings()):
+        for _ in range(random.randint(0, 4)):
+            store.add_rating_value(rating, random.randint(1, 5))
+    return store
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def measure(store, repeat):
+    timings = {}
+    for name, filters in QUERIES.items():
+        timings[name] = timed(lambda: store.query_books(filters), repeat)
+        timings[name + " count"] = timed(lambda: store.count_books(filters), repeat)
+    timings["top"] = timed(store.top_ratings, repeat)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row store versus columnar catalog query latency")
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in (int(size) for size in args.sizes.split(",")):
+        results = {}
+        for columnar in (False, True):
+            results[columnar] = measure(populate(size, columnar), args.repeat)
+        print(f"{size} books")
+        for name in results[False]:
+            print(f"  {name:>26}: {results[False][name]:9.2f} ms rows {results[True][name]:9.2f} ms columnar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from controllers.books_controller import get_book, update_book
+from controllers.ratings_controller import get_book_ratings, add_rating
+from data.database import repository
+from models.book import Book
+from models.rating import Rating
+
+# single-item request latency as the catalog grows; the handlers are called
+# inside a request context so routing and the test client do not add noise
+
+
+def populate(size):
+    repository.clear()
+    for i in range(1, size + 1):
+        book_id = str(i)
+        repository.save_book(
+            Book(book_id, f"isbn-{i}", f"Title {i}", "Fiction", "Author", "Publisher", "2001", ["eng"], "summary"),
+            Rating(book_id, f"Title {i}")
+        )
+
+
+def measure(size, lookups):
+    ids = [str(random.randint(1, size)) for _ in range(lookups)]
+    timings = {}
+    with app.test_request_context():
+        for name, fn in (
+            ("get_book", lambda book_id: get_book(book_id)),
+            ("get_book_ratings", lambda book_id: get_book_ratings(book_id)),
+            ("add_rating", lambda book_id: add_rating(book_id, 4)),
+            ("update_book", lambda book_id: update_book(book_id, {
+                "ISBN": f"isbn-{book_id}", "title": "Title", "genre": "Fiction", "authors": "Author",
+                "publisher": "Publisher", "publishedDate": "2001", "language": ["eng"], "summary": "summary"
+            }))
+        ):
+            start = time.perf_counter()
+            for book_id in ids:
+                fn(book_id)
+            timings[name] = (time.perf_counter() - start) / lookups * 1e6
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-item handler latency by catalog size")
+    parser.add_argument("--sizes", default="1000,10000,100000,300000")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'books':>8} " + " ".join(f"{name:>18}" for name in ("get_book", "get_book_ratings", "add_rating", "update_book")))
+    for size in (int(size) for size in args.sizes.split(",")):
+        populate(size)
+        timings = measure(size, args.lookups)
+        print(f"{size:>8} " + " ".join(f"{timings[name]:15.1f} us" for name in ("get_book", "get_book_ratings", "add_rating", "update_book")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.book import Book
+from models.rating import Rating
+
+# bytes held per Book and per Rating as the catalog grows; strings are built
+# per record, as they would be when parsed from request and upstream JSON
+
+GENRES = ["Fiction", "Children", "Biography", "Science", "Science Fiction", "Fantasy", "Other"]
+LANGUAGES = [["eng"], ["heb"], ["spa"], ["eng", "spa"], ["chi"]]
+
+
+def copy_string(value):
+    # a fresh str object with the same contents, like json.loads produces
+    return "".join(list(value))
+
+
+def make_book(i):
+    return Book(
+        str(i), f"978{i:010d}", f"Title {i}", copy_string(random.choice(GENRES)), f"Author {i % 5000}",
+        copy_string(f"Publisher {i % 200}"), str(1990 + i % 30), [copy_string(code) for code in random.choice(LANGUAGES)],
+        "missing"
+    )
+
+
+def make_rating(i, values):
+    rating = Rating(str(i), f"Title {i}")
+    for _ in range(values):
+        rating.add_value(random.randint(1, 5))
+    return rating
+
+
+def measure(fn, size):
+    gc.collect()
+    tracemalloc.start()
+    items = [fn(i) for i in range(size)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per Book and Rating by catalog size")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--values", type=int, default=10, help="rating values per book")
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'entries':>8} {'per book':>12} {'per rating':>12} {'per value':>12}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        per_book = measure(make_book, size)
+        per_empty_rating = measure(lambda i: make_rating(i, 0), size)
+        per_rating = measure(lambda i: make_rating(i, args.values), size)
+        per_value = (per_rating - per_empty_rating) / args.values if args.values else 0.0
+        print(f"{size:>8} {per_book:10.1f} B {per_rating:10.1f} B {per_value:10.2f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.binary_snapshot import write_snapshot
+from data.durable_repository import DurableMemoryRepository, SNAPSHOT_NAME
+from data.memory_repository import MemoryRepository
+from models.book import Book
+from models.rating import Rating
+
+# cold start from a binary snapshot in several worker processes at once; the
+# snapshot pages are shared through the page cache, so Shared_Clean grows
+# while each worker's private memory holds only the decoded fields. A store
+# directory belongs to one process, so each worker opens its own directory
+# holding a hard link to the same snapshot file
+
+GENRES = ["Fiction", "Children", "Biography", "Science", "Science Fiction", "Fantasy", "Other"]
+
+
+def write(directory, books, values):
+    random.seed(0)
+    catalog = []
+    ratings = []
+    for i in range(1, books + 1):
+        catalog.append(Book(str(i), f"isbn-{i}", f"Title {i}", random.choice(GENRES), f"Author {i % 1000}",
+                            f"Publisher {i % 50}", str(1990 + i % 30), ["eng"], f"Summary of book {i}. " * 8))
+        rating = Rating(str(i), f"Title {i}")
+        for _ in range(values):
+            rating.add_value(random.randint(1, 5))
+        ratings.append(rating)
+    indexes = MemoryRepository().secondary_indexes
+    write_snapshot(os.path.join(directory, SNAPSHOT_NAME.format(1)), 1, books, catalog, ratings, indexes)
+
+
+def memory():
+    # kB figures of this process from /proc (Linux only)
+    try:
+        with open("/proc/self/smaps_rollup") as rollup:
+            fields = dict(line.split(":", 1) for line in rollup if ":" in line)
+        return {name: int(fields[name].split()[0]) for name in ("Rss", "Shared_Clean", "Private_Dirty")}
+    except OSError:
+        return {}
+
+
+def worker(directory):
+    start = time.perf_counter()
+    repository = DurableMemoryRepository(directory, snapshot_interval=0)
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    # reads every summary and rating, as a full scan would
+    for book in repository.all_books():
+        book.summary
+    for rating in repository.all_ratings():
+        rating.average
+    scanned = time.perf_counter() - start
+    usage = memory()
+    print(f"pid {os.getpid()}: load {loaded:6.2f} s, full scan {scanned:6.2f} s, "
+          + ", ".join(f"{name} {kb / 1024:.0f} MB" for name, kb in usage.items()), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary snapshot load time and page sharing across processes")
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--values", type=int, default=10, help="rating values per book")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write(directory, args.books, args.values)
+        snapshot = os.path.join(directory, SNAPSHOT_NAME.format(1))
+        size = os.path.getsize(snapshot)
+        print(f"snapshot of {args.books} books: {size / 1e6:.0f} MB, built and written in {time.perf_counter() - start:.1f} s")
+        worker_directories = []
+        for number in range(args.processes):
+            worker_directory = os.path.join(directory, f"worker-{number}")
+            os.mkdir(worker_directory)
+            os.link(snapshot, os.path.join(worker_directory, SNAPSHOT_NAME.format(1)))
+            worker_directories.append(worker_directory)
+        workers = [subprocess.Popen([sys.executable, __file__, "--worker", worker_directory]) for worker_directory in worker_directories]
+        for process in workers:
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
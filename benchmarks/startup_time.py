@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# each run is a fresh interpreter, like a newly forked worker; --eager-gemini
+# imports google.generativeai up front to reproduce the import-time cost the
+# app used to pay
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+if {eager}:
+    import google.generativeai
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/books')
+first_request = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (first_request - imported) * 1000,
+    "gemini_loaded": "google.generativeai" in sys.modules
+}}))
+"""
+
+
+def run(eager, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", PROBE.format(eager=eager)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return samples
+
+
+def report(label, samples):
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    first_request_ms = statistics.median(sample["first_request_ms"] for sample in samples)
+    loaded = samples[0]["gemini_loaded"]
+    print(f"{label:<8} import app: {import_ms:8.1f} ms   first GET /books: {first_request_ms:7.1f} ms   gemini loaded: {loaded}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and first-request latency of app.py in a fresh process")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    report("before", run(True, args.runs))
+    report("after", run(False, args.runs))
+
+
+if __name__ == "__main__":
+    main()
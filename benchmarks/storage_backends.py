@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# latency of the existing routes on the memory and SQLite backends; the
+# backend is chosen at import time, so each one runs in its own process
+
+GENRES = ["Fiction", "Children", "Biography", "Science", "Science Fiction", "Fantasy", "Other"]
+LANGUAGES = [["eng"], ["heb"], ["spa"], ["eng", "spa"], ["chi"]]
+
+
+def populate(repository, size):
+    from models.book import Book
+    from models.rating import Rating
+
+    repository.clear()
+    random.seed(size)
+    for i in range(1, size + 1):
+        book_id = repository.next_id()
+        repository.save_book(
+            Book(book_id, f"isbn-{i}", f"Title {i}", random.choice(GENRES), f"Author {i % 1000}",
+                 f"Publisher {i % 50}", str(1990 + i % 30), random.choice(LANGUAGES), "summary"),
+            Rating(book_id, f"Title {i}")
+        )
+
+
+def measure(client, size, requests):
+    ids = [str(random.randint(1, size)) for _ in range(requests)]
+    routes = {
+        "GET /books/<id>": lambda book_id: client.get(f"/books/{book_id}"),
+        "GET /books/isbn/<isbn>": lambda book_id: client.get(f"/books/isbn/isbn-{book_id}"),
+        "POST /ratings/<id>/values": lambda book_id: client.post(f"/ratings/{book_id}/values", json={"value": 4}),
+        "GET /ratings/<id>": lambda book_id: client.get(f"/ratings/{book_id}"),
+        "PUT /books/<id>": lambda book_id: client.put(f"/books/{book_id}", json={
+            "ISBN": f"isbn-{book_id}", "title": f"Title {book_id}", "genre": "Fiction", "authors": "Author",
+            "publisher": "Publisher", "publishedDate": "2001", "language": ["eng"], "summary": "summary"
+        }),
+        "GET /books:count?genre": lambda book_id: client.get("/books:count?genre=Fantasy,Science"),
+        "GET /books?genre&language": lambda book_id: client.get("/books?genre=Biography&language=heb")
+    }
+    timings = {}
+    for name, fn in routes.items():
+        repeat = requests if "?" not in name else max(1, requests // 20)
+        start = time.perf_counter()
+        for book_id in ids[:repeat]:
+            fn(book_id)
+        timings[name] = (time.perf_counter() - start) / repeat * 1e6
+    start = time.perf_counter()
+    client.get("/top")
+    timings["GET /top"] = (time.perf_counter() - start) * 1e6
+    return timings
+
+
+def run_backend(sizes, requests):
+    from app import app
+    from data.database import repository
+
+    client = app.test_client()
+    for size in sizes:
+        populate(repository, size)
+        for name, micros in measure(client, size, requests).items():
+            print(f"{os.environ['STORAGE_BACKEND']:>7} {size:>8} {name:>28} {micros:12.1f} us", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route latency on the memory and SQLite storage backends")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--backend", choices=["memory", "sqlite"])
+    args = parser.parse_args()
+
+    if args.backend:
+        run_backend([int(size) for size in args.sizes.split(",")], args.requests)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in ("memory", "sqlite"):
+            env = dict(os.environ, STORAGE_BACKEND=backend, SQLITE_STORE_PATH=os.path.join(directory, "books.sqlite3"))
+            subprocess.run([sys.executable, __file__, "--backend", backend, "--sizes", args.sizes, "--requests", str(args.requests)], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.memory_repository import MemoryRepository
+from data.sqlite_repository import SqliteRepository
+from models.book import Book
+from models.rating import Rating
+
+# many threads adding, updating, rating, deleting and querying one store at
+# once, then checking that no write was lost and every index still agrees
+# with the books; an update always sets a genre and its matching publisher,
+# so a reader that sees them disagree has seen a half-applied update
+
+GENRES = ["Fiction", "Children", "Biography", "Science", "Science Fiction", "Fantasy", "Other"]
+LANGUAGES = [["eng"], ["heb"], ["eng", "spa"], ["chi"]]
+
+
+def new_book(book_id, genre):
+    return Book(book_id, f"isbn-{book_id}", f"Title {book_id}", genre, f"Author {int(book_id) % 100}",
+                f"P-{genre}", "2001", random.choice(LANGUAGES), "summary")
+
+
+class Stress:
+    def __init__(self, store, seed_books):
+        self.store = store
+        self.errors = []
+        self.torn_reads = 0
+        self.operations = Counter()
+        self.lock = threading.Lock()
+        # ratings go to seeded books, which are never deleted
+        self.rated = Counter()
+        self.rated_totals = Counter()
+        self.seed_ids = [self.add() for _ in range(seed_books)]
+
+    def add(self):
+        book_id = self.store.next_id()
+        book = new_book(book_id, random.choice(GENRES))
+        self.store.save_book(book, Rating(book_id, book.title))
+        return book_id
+
+    def check(self, book):
+        if book is not None and book.publisher != f"P-{book.genre}":
+            with self.lock:
+                self.torn_reads += 1
+
+    def worker(self, deadline):
+        own = []
+        rated = Counter()
+        totals = Counter()
+        operations = Counter()
+        try:
+            while time.perf_counter() < deadline:
+                choice = random.random()
+                if choice < 0.15:
+                    own.append(self.add())
+                    operations["add"] += 1
+                elif choice < 0.45:
+                    book_id = random.choice(self.seed_ids)
+                    value = random.randint(1, 5)
+                    if self.store.add_rating_value(self.store.find_rating(book_id), value) is not None:
+                        rated[book_id] += 1
+                        totals[book_id] += value
+                    operations["rate"] += 1
+                elif choice < 0.6:
+                    book = self.store.find_book(random.choice(self.seed_ids + own))
+                    if book is not None:
+                        genre = random.choice(GENRES)
+                        self.check(self.store.update_book(book, {"genre": genre, "publisher": f"P-{genre}"}))
+                    operations["update"] += 1
+                elif choice < 0.65 and own:
+                    self.store.remove_book(own.pop(random.randrange(len(own))))
+                    operations["delete"] += 1
+                elif choice < 0.85:
+                    self.check(self.store.find_book(random.choice(self.seed_ids)))
+                    operations["read"] += 1
+                else:
+                    genre = random.choice(GENRES)
+                    for book in self.store.query_books([("genre", genre)]):
+                        self.check(book)
+                    operations["query"] += 1
+        except Exception as e:
+            with self.lock:
+                self.errors.append(repr(e))
+        with self.lock:
+            self.rated.update(rated)
+            self.rated_totals.update(totals)
+            self.operations.update(operations)
+
+    def run(self, threads, seconds):
+        deadline = time.perf_counter() + seconds
+        workers = [threading.Thread(target=self.worker, args=(deadline,)) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def problems(self):
+        problems = list(self.errors)
+        if self.torn_reads:
+            problems.append(f"{self.torn_reads} reads saw a half-applied update")
+
+        books = self.store.all_books()
+        ids = [book.id for book in books]
+        if len(ids) != len(set(ids)):
+            problems.append("duplicate book ids")
+        if sorted(ids) != sorted(rating.id for rating in self.store.all_ratings()):
+            problems.append("books and ratings disagree")
+        for book in books:
+            found = self.store.find_book_by_isbn(book.ISBN)
+            if found is None or found.id != book.id:
+                problems.append(f"ISBN lookup of book {book.id} is wrong")
+            self.check(book)
+
+        for book_id in self.seed_ids:
+            rating = self.store.find_rating(book_id)
+            if len(rating.values) != self.rated[book_id] or rating.total != self.rated_totals[book_id]:
+                problems.append(f"book {book_id} has {len(rating.values)} ratings, {self.rated[book_id]} were added")
+
+        for genre in GENRES:
+            indexed = sorted(book.id for book in self.store.query_books([("genre", genre)]))
+            scanned = sorted(book.id for book in books if book.genre == genre)
+            if indexed != scanned or self.store.count_books([("genre", genre)]) != len(scanned):
+                problems.append(f"genre index for {genre} disagrees with the books")
+        return problems
+
+
+def backends(directory):
+    yield "memory", MemoryRepository()
+    try:
+        yield "memory (columnar)", MemoryRepository(columnar=True)
+    except RuntimeError:
+        pass
+    yield "sqlite", SqliteRepository(os.path.join(directory, "stress.sqlite3"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writers and readers against each store backend")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--books", type=int, default=200)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for name, store in backends(directory):
+            stress = Stress(store, args.books)
+            stress.run(args.threads, args.seconds)
+            operations = sum(stress.operations.values())
+            problems = stress.problems()
+            failed = failed or bool(problems)
+            print(f"{name:>18}: {operations / args.seconds:10.0f} ops/s with {args.threads} threads, "
+                  f"{'ok' if not problems else f'{len(problems)} problems'}")
+            for problem in problems[:10]:
+                print(f"{'':>20}{problem}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
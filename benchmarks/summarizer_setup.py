@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+import config
+from util.summarizer import SAFETY_SETTINGS, Summarizer
+
+# measures the client setup paid on every summary request; no request is sent
+# to Gemini, so this isolates configure + GenerativeModel construction
+
+
+def per_request_setup():
+    genai.configure(api_key=config.GEMINI_KEY or "benchmark")
+    return genai.GenerativeModel(config.GEMINI_MODEL, safety_settings=SAFETY_SETTINGS)
+
+
+def measure(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request Gemini client setup cost")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    summarizer = Summarizer(config.GEMINI_MODEL, config.GEMINI_KEY or "benchmark")
+    start = time.perf_counter()
+    summarizer.warmup()
+    warmup_us = (time.perf_counter() - start) * 1e6
+
+    before = measure(per_request_setup, args.iterations)
+    after = measure(summarizer.get_model, args.iterations)
+
+    print(f"configure + GenerativeModel per request: {before:10.2f} us")
+    print(f"shared summarizer client per request:    {after:10.2f} us")
+    print(f"one-time warmup:                         {warmup_us:10.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.durable_repository import DurableMemoryRepository
+from data.write_ahead_log import SEGMENT_NAME
+from models.book import Book
+from models.rating import Rating
+
+# durable write throughput with group commit, then recovery time from a log
+# of N books and M ratings, from a snapshot, and from a snapshot plus tail
+
+GENRES = ["Fiction", "Children", "Biography", "Science", "Science Fiction", "Fantasy", "Other"]
+
+
+def book_document(i):
+    return Book(str(i), f"isbn-{i}", f"Title {i}", random.choice(GENRES), f"Author {i % 1000}",
+                f"Publisher {i % 50}", str(1990 + i % 30), ["eng"], "summary").to_dict()
+
+
+def write_throughput(directory, threads, seconds):
+    repository = DurableMemoryRepository(directory, snapshot_interval=0)
+    deadline = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def writer(slot):
+        while time.perf_counter() < deadline:
+            book_id = repository.next_id()
+            repository.save_book(Book(**book_document(int(book_id))), Rating(book_id, "Title"))
+            rating = repository.find_rating(book_id)
+            for _ in range(4):
+                repository.add_rating_value(rating, random.randint(1, 5))
+            counts[slot] += 5
+
+    workers = [threading.Thread(target=writer, args=(slot,)) for slot in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    repository.close()
+    return sum(counts) / seconds, repository.log.stats()
+
+
+def write_log(directory, books, ratings):
+    # the segment a previous run would have left behind
+    with open(os.path.join(directory, SEGMENT_NAME.format(1)), "wb") as segment:
+        for i in range(1, books + 1):
+            segment.write(json.dumps(["add", book_document(i), f"Title {i}"], separators=(",", ":")).encode("utf-8") + b"\n")
+        counts = [0] * (books + 1)
+        for _ in range(ratings):
+            book_id = random.randint(1, books)
+            counts[book_id] += 1
+            segment.write(json.dumps(["rate", str(book_id), random.randint(1, 5), counts[book_id]], separators=(",", ":")).encode("utf-8") + b"\n")
+
+
+def recover(directory):
+    start = time.perf_counter()
+    repository = DurableMemoryRepository(directory, snapshot_interval=0)
+    return repository, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WAL write throughput and recovery time of the memory store")
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--ratings", type=int, default=10000000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        throughput, log_stats = write_throughput(directory, args.threads, args.seconds)
+        print(f"durable writes: {throughput:10.0f} ops/s with {args.threads} threads, "
+              f"{log_stats['avg_records_per_commit']:.1f} records per fsync, {log_stats['avg_commit_ms']:.2f} ms per commit")
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_log(directory, args.books, args.ratings)
+        size = os.path.getsize(os.path.join(directory, SEGMENT_NAME.format(1)))
+        print(f"log of {args.books} books and {args.ratings} ratings: {size / 1e6:.0f} MB written in {time.perf_counter() - start:.1f} s")
+
+        repository, seconds = recover(directory)
+        print(f"recovery from the log:              {seconds:8.1f} s")
+
+        snapshot = repository.snapshot()
+        print(f"snapshot:                           {snapshot['seconds']:8.1f} s")
+
+        # each recovery stands for a restart, so the previous store lets go
+        repository.close()
+        repository, seconds = recover(directory)
+        print(f"recovery from the snapshot:         {seconds:8.1f} s")
+
+        tail = max(1, args.ratings // 100)
+        ratings = list(repository.ratings.values())
+        for _ in range(tail):
+            rating = random.choice(ratings)
+            repository.log.enqueue(["rate", rating.id, 5, len(rating.values) + 1])
+            rating.add_value(5)
+        repository.close()
+        repository, seconds = recover(directory)
+        print(f"recovery from snapshot + {tail} records: {seconds:8.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from data.openlibrary_index import build_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline ISBN index from OpenLibrary bulk dumps")
+    parser.add_argument("editions", help="ol_dump_editions file, optionally gzipped")
+    parser.add_argument("--authors", help="ol_dump_authors file, optionally gzipped, to resolve author names")
+    parser.add_argument("--output", default=config.OPENLIBRARY_INDEX_PATH, help="SQLite index to write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = build_index(args.editions, args.output, args.authors)
+    print(f"indexed {counts['isbns']} ISBNs and {counts['authors']} authors into {args.output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import json
+import sys
+import requests
+
+
+def read_records(path):
+    # accepts a JSON list or one JSON object per line
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    if content.lstrip().startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def import_books(records, url, chunk_size):
+    results = []
+    with requests.Session() as session:
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            response = session.post(f"{url}/books:batch", json=chunk, timeout=600)
+            response.raise_for_status()
+            for result in response.json():
+                result["index"] += start
+                results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import {ISBN, title, genre} records through POST /books:batch")
+    parser.add_argument("path", help="JSON list or JSON lines file of books")
+    parser.add_argument("--url", default="http://localhost:8000", help="base url of the books service")
+    parser.add_argument("--chunk-size", type=int, default=500, help="records per batch request")
+    args = parser.parse_args()
+
+    results = import_books(read_records(args.path), args.url.rstrip("/"), args.chunk_size)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+    created = sum(1 for result in results if result["status"] == 201)
+    print(f"{created} of {len(results)} books imported", file=sys.stderr)
+    return 0 if created == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
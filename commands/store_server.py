@@ -0,0 +1,24 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from data.backends import create_repository
+from data.store_server import StoreServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve one catalog to every worker process started with STORAGE_BACKEND=remote")
+    parser.add_argument("--backend", default="memory", choices=["memory", "sqlite"], help="storage behind the server")
+    parser.add_argument("--socket", default=config.STORE_SOCKET_PATH, help="Unix socket to listen on")
+    args = parser.parse_args()
+
+    server = StoreServer(create_repository(args.backend), args.socket)
+    print(f"serving the {args.backend} catalog on {args.socket}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
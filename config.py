@@ -0,0 +1,109 @@
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+def env_path(name, default):
+    # an empty value disables the file
+    value = os.getenv(name, default)
+    return value or None
+
+
+GEMINI_KEY = os.getenv("GEMINI_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+GEMINI_WARMUP = os.getenv("GEMINI_WARMUP", "false").lower() == "true"
+GEMINI_BATCH_SIZE = env_int("GEMINI_BATCH_SIZE", 10)
+
+# Google Books volumeInfo cache
+ISBN_CACHE_PATH = env_path("ISBN_CACHE_PATH", os.path.join(BASE_DIR, "data", "isbn_cache.sqlite3"))
+ISBN_CACHE_TTL = env_float("ISBN_CACHE_TTL", 7 * 24 * 3600)
+ISBN_CACHE_MAX_SIZE = env_int("ISBN_CACHE_MAX_SIZE", 10000)
+
+# Gemini summaries by (title, authors)
+SUMMARY_CACHE_PATH = env_path("SUMMARY_CACHE_PATH", "")
+SUMMARY_CACHE_TTL = env_float("SUMMARY_CACHE_TTL", 30 * 24 * 3600)
+SUMMARY_CACHE_MAX_SIZE = env_int("SUMMARY_CACHE_MAX_SIZE", 5000)
+
+# outbound HTTP client
+HTTP_POOL_SIZE = env_int("HTTP_POOL_SIZE", 10)
+HTTP_CONNECT_TIMEOUT = env_float("HTTP_CONNECT_TIMEOUT", 3.05)
+HTTP_READ_TIMEOUT = env_float("HTTP_READ_TIMEOUT", 10)
+HTTP_MAX_RETRIES = env_int("HTTP_MAX_RETRIES", 2)
+HTTP_BACKOFF = env_float("HTTP_BACKOFF", 0.2)
+HTTP_RETRY_BUDGET_RATIO = env_float("HTTP_RETRY_BUDGET_RATIO", 0.2)
+
+# background enrichment jobs for asynchronous POST /books
+ASYNC_INGESTION = os.getenv("ASYNC_INGESTION", "false").lower() == "true"
+JOB_WORKERS = env_int("JOB_WORKERS", 4)
+JOB_QUEUE_SIZE = env_int("JOB_QUEUE_SIZE", 100)
+JOB_HISTORY_SIZE = env_int("JOB_HISTORY_SIZE", 1000)
+
+# bulk import
+BATCH_MAX_RECORDS = env_int("BATCH_MAX_RECORDS", 1000)
+BATCH_PARALLELISM = env_int("BATCH_PARALLELISM", 4)
+GOOGLE_BOOKS_BATCH_SIZE = env_int("GOOGLE_BOOKS_BATCH_SIZE", 10)
+OPEN_LIBRARY_BATCH_SIZE = env_int("OPEN_LIBRARY_BATCH_SIZE", 50)
+
+# circuit breakers and hedged requests for the upstream APIs
+BREAKER_FAILURE_RATE = env_float("BREAKER_FAILURE_RATE", 0.5)
+BREAKER_SLOW_CALL_MS = env_float("BREAKER_SLOW_CALL_MS", 5000)
+BREAKER_SLOW_CALL_RATE = env_float("BREAKER_SLOW_CALL_RATE", 0.8)
+BREAKER_WINDOW_SIZE = env_int("BREAKER_WINDOW_SIZE", 20)
+BREAKER_MIN_CALLS = env_int("BREAKER_MIN_CALLS", 10)
+BREAKER_OPEN_SECONDS = env_float("BREAKER_OPEN_SECONDS", 30)
+HEDGE_UPSTREAMS = {name.strip() for name in os.getenv("HEDGE_UPSTREAMS", "").split(",") if name.strip()}
+HEDGE_MIN_DELAY_MS = env_float("HEDGE_MIN_DELAY_MS", 50)
+HEDGE_WORKERS = env_int("HEDGE_WORKERS", 16)
+
+# "eager" summarizes during POST /books, "lazy" on the first GET /books/<id>
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "eager").lower()
+
+# ISBNs Google Books does not know
+NEGATIVE_CACHE_TTL = env_float("NEGATIVE_CACHE_TTL", 600)
+NEGATIVE_CACHE_MAX_SIZE = env_int("NEGATIVE_CACHE_MAX_SIZE", 10000)
+
+# outbound quota shared by the worker processes of this host; a rate of 0
+# disables the limiter for that upstream
+RATE_LIMIT_DIR = os.getenv("RATE_LIMIT_DIR", tempfile.gettempdir())
+RATE_LIMIT_MAX_WAIT = env_float("RATE_LIMIT_MAX_WAIT", 5)
+GOOGLE_BOOKS_RATE = env_float("GOOGLE_BOOKS_RATE", 10)
+GOOGLE_BOOKS_BURST = env_float("GOOGLE_BOOKS_BURST", 20)
+GEMINI_RATE = env_float("GEMINI_RATE", 1)
+GEMINI_BURST = env_float("GEMINI_BURST", 5)
+
+# offline OpenLibrary ISBN index; with OPENLIBRARY_INDEX_OFFLINE=true ISBNs
+# missing from the index are not looked up online either
+OPENLIBRARY_INDEX_PATH = env_path("OPENLIBRARY_INDEX_PATH", os.path.join(BASE_DIR, "data", "openlibrary_index.sqlite3"))
+OPENLIBRARY_INDEX_OFFLINE = os.getenv("OPENLIBRARY_INDEX_OFFLINE", "false").lower() == "true"
+
+# catalog storage: "memory", "sqlite", or "remote" for worker processes that
+# share the catalog of a store server (commands/store_server.py)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").lower()
+STORE_SOCKET_PATH = os.getenv("STORE_SOCKET_PATH", os.path.join(tempfile.gettempdir(), "books-store.sock"))
+REMOTE_CACHE_MAX_SIZE = env_int("REMOTE_CACHE_MAX_SIZE", 100000)
+SQLITE_STORE_PATH = env_path("SQLITE_STORE_PATH", os.path.join(BASE_DIR, "data", "books.sqlite3"))
+
+# write-ahead log and snapshots of the memory backend; an empty directory
+# keeps the catalog in memory only. A single process owns the directory, so
+# with several workers only commands/store_server.py opens it and the
+# workers use STORAGE_BACKEND=remote
+MEMORY_STORE_DIR = env_path("MEMORY_STORE_DIR", "")
+WAL_COMMIT_INTERVAL_MS = env_float("WAL_COMMIT_INTERVAL_MS", 2)
+SNAPSHOT_INTERVAL = env_float("SNAPSHOT_INTERVAL", 300)
+SNAPSHOT_MIN_RECORDS = env_int("SNAPSHOT_MIN_RECORDS", 10000)
+
+# NumPy column copy of the memory catalog for vectorized GET /books filters,
+# counts and /top; needs numpy installed
+COLUMNAR_CATALOG = os.getenv("COLUMNAR_CATALOG", "false").lower() == "true"
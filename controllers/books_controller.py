@@ -1,151 +1,343 @@
 import re
-import requests
+import threading
 from flask import jsonify
-from data.database import books
-from data.database import ratings
-from models.book import Book
+from data.database import repository
+from data.repository import DuplicateIsbnError
+from models.book import Book, PENDING_SUMMARY
 from models.rating import Rating
 from util.jsonify_tools import custom_jsonify
-from dotenv import load_dotenv
-import requests
-import google.generativeai as genai
-import os
+from controllers.enrichment import Enrichment, EnrichmentError, server_timing_header, google_books_error, gemini_error, is_known_missing, IsbnNotFoundError, generate_summary, generate_summaries_batch, refresh_summary, executor, fetch_google_books_batch, fetch_open_library_languages_batch
+import config
+from controllers.jobs_controller import submit_job
 
-# initialize the generative AI configuration
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_KEY"))
-current_max_id = 0
+# ISBNs whose enrichment is still in flight
+reserved_isbns = set()
+reservation_lock = threading.Lock()
 
-def add_book(data):
+# (message, status) answers of reserve_isbn; an insert still in flight may
+# yet fail, so a retry is told to come back rather than that the book exists
+ISBN_EXISTS = ("A book with this ISBN already exists", 422)
+ISBN_IN_PROGRESS = ("A book with this ISBN is still being added; try again later", 409)
+
+
+def normalize_published_date(published_date):
+    if published_date != "missing":
+        valid_date_formats = [
+            r"^\d{4}$", #YYYY
+            r"^\d{4}-\d{2}-\d{2}$", #YYYY-MM-DD
+        ]
+
+        if not any(re.match(pattern, published_date) for pattern in valid_date_formats):
+            published_date = "missing"
+
+    return published_date
+
+
+def validate_new_book(data):
     expected_fields = {'ISBN', 'title', 'genre'}
     received_fields = set(data.keys())
 
     if received_fields != expected_fields:
-        return jsonify({"error": "ISBN, title, and genre fields (and only them) must be provided"}), 422
+        return "ISBN, title, and genre fields (and only them) must be provided"
 
-    isbn = data['ISBN']
-    title = data['title']
-    genre = data['genre']
+    if not isinstance(data['ISBN'], str) or not isinstance(data['title'], str):
+        return "ISBN and title must be strings"
 
     valid_genres = ['Fiction', 'Children', 'Biography', 'Science', 'Science Fiction', 'Fantasy', 'Other']
-    if genre not in valid_genres:
-        return jsonify({"error": "Invalid genre; acceptable genres are Fiction, Children, Biography, Science, Science Fiction, Fantasy, Other"}), 422
+    if data['genre'] not in valid_genres:
+        return "Invalid genre; acceptable genres are Fiction, Children, Biography, Science, Science Fiction, Fantasy, Other"
 
-    existing_book = [book for book in books if book.ISBN == isbn]
-    if existing_book:
-        return jsonify({"error": "A book with this ISBN already exists"}), 422
+    return None
 
-    # fetch data from Google Books API
-    google_books_url = f'https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}'
-    try:
-        response = requests.get(google_books_url)
-        response.raise_for_status()
-        google_books_data = response.json()['items'][0]['volumeInfo']
-    except requests.exceptions.HTTPError as e:
-        return jsonify({"error": f"Unable to connect to Google Books API"}), 500
-    except (IndexError, KeyError):
-        return jsonify({"error": "Invalid ISBN number; not found in Google Books API"}), 422
 
+def reserve_isbn(isbn):
+    # claims the ISBN so that concurrent or background inserts of the same
+    # ISBN in this process are rejected before any lookup; the store itself
+    # enforces uniqueness across processes when the book is saved. Returns
+    # None once claimed, otherwise ISBN_EXISTS or ISBN_IN_PROGRESS
+    with reservation_lock:
+        if repository.find_book_by_isbn(isbn):
+            return ISBN_EXISTS
+        if isbn in reserved_isbns:
+            return ISBN_IN_PROGRESS
+        reserved_isbns.add(isbn)
+        return None
+
+
+def release_isbn(isbn):
+    with reservation_lock:
+        reserved_isbns.discard(isbn)
+
+
+def metadata_fields(google_books_data):
     authors_list = google_books_data.get('authors', ["missing"])
     authors = " and ".join(authors_list)
 
     publisher = google_books_data.get("publisher", "missing")
 
-    published_date = google_books_data.get("publishedDate", "missing")
-    if published_date != "missing":
-        valid_date_formats = [
-        r"^\d{4}$", #YYYY
-        r"^\d{4}-\d{2}-\d{2}$", #YYYY-MM-DD
-    ]
-    
-    if not any(re.match(pattern, published_date) for pattern in valid_date_formats):
-        published_date = "missing"
+    published_date = normalize_published_date(google_books_data.get("publishedDate", "missing"))
 
-    # fetch data from OpenLibrary API
-    open_library_url = f'https://openlibrary.org/search.json?q={isbn}&fields=key,title,author_name,language'
-    try:
-        open_lib_response = requests.get(open_library_url)
-        open_lib_response.raise_for_status()
-        open_lib_data = open_lib_response.json().get('docs', [])
-        
-        if not open_lib_data:
-            language = ["missing"]
-        else:
-            language = open_lib_data[0].get("language", ["missing"])
-    except (requests.exceptions.HTTPError, ValueError):
-        language = ["missing"]
-
-    # fetch summary using Google Gemini API
-    prompt = f'Summarize the book "{title}" by {authors} in 5 sentences or less. If you don\'t know the book, return the word "missing" and only this word."'
+    return {"authors": authors, "publisher": publisher, "publishedDate": published_date}
+
+
+def enrich_book(isbn, title):
+    # known-missing ISBNs are answered without starting any lookup
+    if is_known_missing(isbn):
+        raise google_books_error(IsbnNotFoundError(isbn))
 
+    # start the Google Books and OpenLibrary lookups concurrently
+    enrichment = Enrichment(isbn)
     try:
-        model = genai.GenerativeModel('gemini-pro', 
-            safety_settings=[
-                {"category": "HARM_CATEGORY_DANGEROUS", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-            ]
-        )
-
-        llm_response = model.generate_content(prompt)
-        summary = llm_response.text if llm_response else "missing"
-    
+        google_books_data = enrichment.google_books_data()
     except Exception as e:
-        return jsonify({"error": "Unable to connect to Gemini"}), 500
+        enrichment.cancel()
+        raise google_books_error(e)
 
-    # create and add the new book
-    global current_max_id
-    current_max_id += 1
-    new_id = str(current_max_id)
+    fields = metadata_fields(google_books_data)
+
+    # fetch summary using Google Gemini API while OpenLibrary is still in flight
+    if config.SUMMARY_MODE == "lazy":
+        fields["summary"] = PENDING_SUMMARY
+    else:
+        try:
+            fields["summary"] = enrichment.summary(title, fields["authors"])
+        except Exception as e:
+            enrichment.cancel()
+            raise gemini_error(e)
 
-    new_book = Book(new_id, isbn, title, genre, authors, publisher, published_date, language, summary)
-    books.append(new_book)
+    fields["language"] = enrichment.language()
+    timings = enrichment.finish()
 
+    return fields, timings
+
+
+def insert_book(isbn, title, genre, fields, new_id=None):
+    # create and add the new book
+    if new_id is None:
+        new_id = repository.next_id()
+
+    new_book = Book(new_id, isbn, title, genre, fields["authors"], fields["publisher"], fields["publishedDate"], fields["language"], fields["summary"])
     new_rating = Rating(new_id, title)
-    ratings.append(new_rating)
+    repository.save_book(new_book, new_rating)
+
+    return new_id
+
+
+def ingest_book(isbn, title, genre, new_id=None):
+    try:
+        fields, timings = enrich_book(isbn, title)
+        new_id = insert_book(isbn, title, genre, fields, new_id)
+    except DuplicateIsbnError:
+        # another worker process saved the ISBN first
+        raise EnrichmentError("A book with this ISBN already exists", 422)
+    finally:
+        release_isbn(isbn)
+
+    return new_id, timings
+
+
+def enrich_batch_record(google_books_data, language):
+    if isinstance(google_books_data, Exception):
+        error = google_books_error(google_books_data)
+        # an unexpected lookup failure fails this record only
+        if not isinstance(error, EnrichmentError):
+            error = EnrichmentError("Unable to connect to Google Books API", 500)
+        raise error
+
+    fields = metadata_fields(google_books_data)
+    fields["language"] = language
+    fields["summary"] = PENDING_SUMMARY
+
+    return fields
+
+
+def import_books(records):
+    # validates every record like add_book, then resolves the metadata of the
+    # accepted ones with batched upstream lookups
+    results = []
+    accepted = []
+    # every ISBN reserved so far is released however the batch ends
+    reserved = []
+    try:
+        for index, data in enumerate(records):
+            error = validate_new_book(data) if isinstance(data, dict) else "Each record must be a JSON object"
+            status = 422
+            # known-missing ISBNs are answered without any lookup, like add_book
+            if not error and is_known_missing(data['ISBN']):
+                error = google_books_error(IsbnNotFoundError(data['ISBN'])).message
+            if not error:
+                conflict = reserve_isbn(data['ISBN'])
+                if conflict:
+                    error, status = conflict
+                else:
+                    reserved.append(data['ISBN'])
+
+            if error:
+                results.append({"index": index, "status": status, "error": error})
+            else:
+                results.append(None)
+                accepted.append((index, data['ISBN'], data['title'], data['genre']))
+
+        isbns = [isbn for _, isbn, _, _ in accepted]
+        google_future = executor.submit(fetch_google_books_batch, isbns)
+        languages = fetch_open_library_languages_batch(isbns)
+        google_books_results = google_future.result()
+
+        enriched = []
+        for index, isbn, title, genre in accepted:
+            try:
+                enriched.append((index, isbn, title, genre, enrich_batch_record(google_books_results[isbn], languages[isbn])))
+            except EnrichmentError as e:
+                results[index] = {"index": index, "ISBN": isbn, "status": e.status_code, "error": e.message}
+
+        # several books share each Gemini call
+        if config.SUMMARY_MODE != "lazy":
+            summaries = generate_summaries_batch([(title, fields["authors"]) for _, _, title, _, fields in enriched])
+            for (_, _, _, _, fields), summary in zip(enriched, summaries):
+                fields["summary"] = summary
+
+        # insert in record order so ids follow the order of the batch
+        for index, isbn, title, genre, fields in enriched:
+            if isinstance(fields["summary"], Exception):
+                error = gemini_error(fields["summary"])
+                results[index] = {"index": index, "ISBN": isbn, "status": error.status_code, "error": error.message}
+                continue
+            # a failed insert is reported for its record and the rest of
+            # the batch goes on
+            try:
+                new_id = insert_book(isbn, title, genre, fields)
+            except DuplicateIsbnError:
+                results[index] = {"index": index, "ISBN": isbn, "status": 422, "error": "A book with this ISBN already exists"}
+                continue
+            except Exception:
+                results[index] = {"index": index, "ISBN": isbn, "status": 500, "error": "Unable to store the book"}
+                continue
+            results[index] = {"index": index, "ISBN": isbn, "status": 201, "id": new_id}
+    finally:
+        for isbn in reserved:
+            release_isbn(isbn)
+
+    return results
+
+
+def add_book(data, run_async=False):
+    error = validate_new_book(data)
+    if error:
+        return jsonify({"error": error}), 422
+
+    isbn = data['ISBN']
+    title = data['title']
+    genre = data['genre']
+
+    conflict = reserve_isbn(isbn)
+    if conflict:
+        message, status = conflict
+        return jsonify({"error": message}), status
+
+    if run_async:
+        new_id = repository.next_id()
+        job = submit_job(new_id, ingest_book, isbn, title, genre, new_id)
+        if job is None:
+            release_isbn(isbn)
+            return jsonify({"error": "Too many pending enrichment jobs; try again later"}), 503
+        return jsonify({"id": new_id, "job_id": job["id"]}), 202, {"Location": f"/jobs/{job['id']}"}
+
+    try:
+        new_id, timings = ingest_book(isbn, title, genre)
+    except EnrichmentError as e:
+        return jsonify({"error": e.message}), e.status_code
+
+    return jsonify({"id": new_id}), 201, {"Server-Timing": server_timing_header(timings)}
+
 
-    return jsonify({"id": new_id}), 201
+def add_books_batch(records):
+    if not isinstance(records, list):
+        return jsonify({"error": "A JSON list of books must be provided"}), 422
+
+    if len(records) > config.BATCH_MAX_RECORDS:
+        return jsonify({"error": f"A batch may contain at most {config.BATCH_MAX_RECORDS} books"}), 422
+
+    results = import_books(records)
+    return jsonify(results), 200
+
+
+def store_summary(book, title, authors, summary):
+    # a PUT may have changed the book while Gemini was answering; returns
+    # the stored copy, or `book` when the summary was not saved
+    return repository.store_summary(book, title, authors, summary) or book
 
 
 def get_book(book_id):
-    for book in books:
-        if book.id == book_id:
-            return custom_jsonify(book.to_dict()), 200
+    return book_response(repository.find_book(book_id))
 
-    return custom_jsonify({"message": "Book not found"}), 404
 
+def get_book_by_isbn(isbn):
+    return book_response(repository.find_book_by_isbn(isbn))
 
-def get_books(query_params):
+
+def book_response(book):
+    if not book:
+        return custom_jsonify({"message": "Book not found"}), 404
+
+    if book.summary == PENDING_SUMMARY:
+        # concurrent first reads share one Gemini call; on failure the
+        # book is served with the summary still pending
+        title, authors = book.title, book.authors
+        try:
+            book = store_summary(book, title, authors, generate_summary(title, authors))
+        except Exception as e:
+            pass
+    return custom_jsonify(book.to_dict()), 200
+
+
+def refresh_book_summary(book_id):
+    book = repository.find_book(book_id)
+    if not book:
+        return custom_jsonify({"message": "Book not found"}), 404
+
+    title, authors = book.title, book.authors
+    try:
+        summary = refresh_summary(title, authors)
+    except Exception as e:
+        error = gemini_error(e)
+        return jsonify({"error": error.message}), error.status_code
+    book = store_summary(book, title, authors, summary)
+    return custom_jsonify({"id": book.id, "summary": book.summary}), 200
+
+
+def book_filters(query_params):
+    # returns the (field, value) filters of a GET /books query, or an error;
+    # genre and language accept comma separated alternatives
     valid_languages = {'heb', 'eng', 'spa', 'chi'}
-    filtered_books = []
-    for book in books:
-        matches_query = True
-        for key, value in query_params.items():
-            if key == 'language':
-                if value not in valid_languages:
-                    return jsonify({"error": f"Invalid language request. Must be one of {list(valid_languages)}."}), 422
-                if not any(value.lower() == lang.lower() for lang in book.language):
-                    matches_query = False
-                    break
-            elif key == 'summery':
-                continue
-            elif str(getattr(book, key, '')).lower() != value.lower():
-                matches_query = False
-                break
-        if matches_query:
-            filtered_books.append(book.to_dict())
+    filters = []
+    for key, value in query_params.items():
+        if key == 'language' and any(language not in valid_languages for language in value.split(',')):
+            return None, f"Invalid language request. Must be one of {list(valid_languages)}."
+        elif key == 'summery':
+            continue
+        filters.append((key, value))
+    return filters, None
+
+
+def get_books(query_params):
+    filters, error = book_filters(query_params)
+    if error:
+        return jsonify({"error": error}), 422
+
+    filtered_books = [book.to_dict() for book in repository.query_books(filters)]
     return jsonify(filtered_books), 200
 
 
-def update_book(book_id, updated_data):
-    book = None
-    for b in books:
-        if b.id == book_id:
-            book = b
-            break
+def count_matching_books(query_params):
+    filters, error = book_filters(query_params)
+    if error:
+        return jsonify({"error": error}), 422
 
+    return jsonify({"count": repository.count_books(filters)}), 200
+
+
+def update_book(book_id, updated_data):
+    book = repository.find_book(book_id)
     if not book:
         return jsonify({"error": "Book not found"}), 404
     
@@ -157,53 +349,32 @@ def update_book(book_id, updated_data):
     if updated_data['genre'] not in valid_genres:
         return jsonify({"error": "Invalid genre; acceptable genres are Fiction, Children, Biography, Science, Science Fiction, Fantasy, Other"}), 422
     
-    published_date = updated_data.get("publishedDate", "missing")
+    if not isinstance(updated_data['ISBN'], str):
+        return jsonify({"error": "ISBN must be a string"}), 422
 
-    if published_date != "missing":
-        valid_date_formats = [
-            r"^\d{4}$", #YYYY
-            r"^\d{4}-\d{2}-\d{2}$", #YYYY-MM-DD
-        ]
-        
-        if not any(re.match(pattern, published_date) for pattern in valid_date_formats):
-            published_date = "missing"
-    
-    updated_data["publishedDate"] = published_date
+    if not isinstance(updated_data['language'], list) or not all(isinstance(language, str) for language in updated_data['language']):
+        return jsonify({"error": "language must be a list of strings"}), 422
+
+    updated_data["publishedDate"] = normalize_published_date(updated_data.get("publishedDate", "missing"))
     
-    if any(other_book for other_book in books if other_book.ISBN == updated_data['ISBN'] and other_book.id != book_id):
+    other_book = repository.find_book_by_isbn(updated_data['ISBN'])
+    if other_book and other_book.id != book_id:
         return jsonify({"error": "A book with this ISBN already exists"}), 422
 
-    for field in required_fields:
-        setattr(book, field, updated_data[field])
+    try:
+        updated = repository.update_book(book, {field: updated_data[field] for field in required_fields})
+    except DuplicateIsbnError:
+        return jsonify({"error": "A book with this ISBN already exists"}), 422
+    if updated is None:
+        return jsonify({"error": "Book not found"}), 404
 
     return jsonify({"id": book_id}), 200
 
 
 def delete_book(book_id):
-    global books
-    global ratings
-
     book_id = str(book_id)
-    book_found = False
-
-    new_books = []
-    new_ratings = []
-
-    for book in books:
-        if str(book.id) == book_id:
-            book_found = True
-        else:
-            new_books.append(book)
 
-    if not book_found:
+    if not repository.remove_book(book_id):
         return jsonify({"message": "Book not found"}), 404
 
-    for rating in ratings:
-        if str(rating.id) != book_id:
-            new_ratings.append(rating)
-
-    books = new_books
-    ratings = new_ratings
-
     return jsonify({"id": book_id}), 200
-
@@ -0,0 +1,387 @@
+import hashlib
+import os
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+import config
+from data.openlibrary_index import OpenLibraryIndex
+from util.cache import LRUCache
+from util.circuit_breaker import CircuitBreaker, CircuitOpenError
+from util.hedging import hedged_call
+from util.http_client import http_client
+from util.isbn import normalize_isbn
+from util.rate_limiter import RateLimitExceeded, SharedTokenBucket
+from util.singleflight import SingleFlight
+from util.summarizer import summarizer
+
+# the most volumes Google Books returns for one search
+GOOGLE_BOOKS_MAX_RESULTS = 40
+
+# shared pool for the upstream lookups of add_book
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="enrichment")
+
+# bounded pool for the chunked lookups and summaries of a bulk import
+batch_executor = ThreadPoolExecutor(max_workers=config.BATCH_PARALLELISM, thread_name_prefix="batch")
+
+# parsed Google Books volumeInfo by normalized ISBN
+isbn_cache = LRUCache(config.ISBN_CACHE_MAX_SIZE, ttl=config.ISBN_CACHE_TTL, path=config.ISBN_CACHE_PATH)
+
+# ISBNs that Google Books answered without a volume, remembered briefly so a
+# broken feed does not hit the upstream on every resubmission
+negative_isbn_cache = LRUCache(config.NEGATIVE_CACHE_MAX_SIZE, ttl=config.NEGATIVE_CACHE_TTL)
+
+# Gemini summaries by a hash of the normalized prompt inputs
+summary_cache = LRUCache(config.SUMMARY_CACHE_MAX_SIZE, ttl=config.SUMMARY_CACHE_TTL, path=config.SUMMARY_CACHE_PATH)
+
+# offline ISBN index built from an OpenLibrary editions dump
+open_library_index = OpenLibraryIndex(config.OPENLIBRARY_INDEX_PATH) if config.OPENLIBRARY_INDEX_PATH and os.path.exists(config.OPENLIBRARY_INDEX_PATH) else None
+
+# concurrent identical lookups share a single upstream call
+google_books_flight = SingleFlight()
+open_library_flight = SingleFlight()
+summary_flight = SingleFlight()
+
+
+def make_breaker(name):
+    return CircuitBreaker(
+        name,
+        failure_rate_threshold=config.BREAKER_FAILURE_RATE,
+        slow_call_ms=config.BREAKER_SLOW_CALL_MS,
+        slow_call_rate_threshold=config.BREAKER_SLOW_CALL_RATE,
+        window_size=config.BREAKER_WINDOW_SIZE,
+        min_calls=config.BREAKER_MIN_CALLS,
+        open_seconds=config.BREAKER_OPEN_SECONDS
+    )
+
+
+breakers = {name: make_breaker(name) for name in ("google_books", "open_library", "gemini")}
+
+
+def make_rate_limiter(name, rate, burst):
+    if rate <= 0:
+        return None
+    return SharedTokenBucket(name, rate, burst, os.path.join(config.RATE_LIMIT_DIR, f"books-rate-limit-{name}"))
+
+
+rate_limiters = {
+    name: limiter for name, limiter in (
+        ("google_books", make_rate_limiter("google_books", config.GOOGLE_BOOKS_RATE, config.GOOGLE_BOOKS_BURST)),
+        ("gemini", make_rate_limiter("gemini", config.GEMINI_RATE, config.GEMINI_BURST))
+    ) if limiter is not None
+}
+
+
+class EnrichmentError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class IsbnNotFoundError(KeyError):
+    pass
+
+
+def call_upstream(upstream, fn, *args):
+    # every upstream call goes through its rate limiter and breaker;
+    # upstreams listed in HEDGE_UPSTREAMS also get a second attempt after
+    # their p95 latency
+    breaker = breakers[upstream]
+    if upstream in config.HEDGE_UPSTREAMS:
+        p95 = breaker.p95()
+        if p95 is not None:
+            return hedged_call(max(p95, config.HEDGE_MIN_DELAY_MS), limited_call, upstream, fn, *args)
+    return limited_call(upstream, fn, *args)
+
+
+def limited_call(upstream, fn, *args):
+    # waits for the shared quota before the breaker sees the call, so a full
+    # queue is not counted as an upstream failure
+    limiter = rate_limiters.get(upstream)
+    if limiter is not None:
+        limiter.acquire(config.RATE_LIMIT_MAX_WAIT)
+    return breakers[upstream].call(fn, *args)
+
+
+def get_json(url, params=None):
+    response = http_client.get(url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def google_books_error(e):
+    if isinstance(e, CircuitOpenError):
+        return EnrichmentError("Google Books API is temporarily unavailable; try again later", 503)
+    if isinstance(e, RateLimitExceeded):
+        return EnrichmentError("Google Books API rate limit reached; try again later", 503)
+    if isinstance(e, requests.exceptions.RequestException):
+        return EnrichmentError("Unable to connect to Google Books API", 500)
+    if isinstance(e, (IndexError, KeyError)):
+        return EnrichmentError("Invalid ISBN number; not found in Google Books API", 422)
+    return e
+
+
+def gemini_error(e):
+    if isinstance(e, CircuitOpenError):
+        return EnrichmentError("Gemini API is temporarily unavailable; try again later", 503)
+    if isinstance(e, RateLimitExceeded):
+        return EnrichmentError("Gemini API rate limit reached; try again later", 503)
+    return EnrichmentError("Unable to connect to Gemini", 500)
+
+
+def chunked(values, size):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+# callers check is_known_missing once, before starting any lookup, so the
+# negative cache counts each submission a single time
+def is_known_missing(isbn):
+    return negative_isbn_cache.get(normalize_isbn(isbn)) is not None
+
+
+def remember_missing(isbn):
+    negative_isbn_cache.set(normalize_isbn(isbn), True)
+
+
+def fetch_google_books(isbn):
+    key = normalize_isbn(isbn)
+    volume_info = isbn_cache.get(key)
+    if volume_info is not None:
+        return volume_info
+
+    return google_books_flight.do(key, request_google_books, isbn, key)
+
+
+def request_google_books(isbn, key):
+    google_books_url = f'https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}'
+    try:
+        volume_info = call_upstream("google_books", get_json, google_books_url)['items'][0]['volumeInfo']
+    except (IndexError, KeyError):
+        remember_missing(isbn)
+        raise
+    isbn_cache.set(key, volume_info)
+    return volume_info
+
+
+def fetch_google_books_batch(isbns):
+    # resolves many ISBNs with multi-ISBN volume searches; the result maps
+    # each ISBN to its volumeInfo or to the exception of its lookup
+    results = {}
+    misses = []
+    for isbn in isbns:
+        volume_info = isbn_cache.get(normalize_isbn(isbn))
+        if volume_info is not None:
+            results[isbn] = volume_info
+        else:
+            misses.append(isbn)
+
+    for chunk_results in batch_executor.map(request_google_books_chunk, chunked(misses, config.GOOGLE_BOOKS_BATCH_SIZE)):
+        results.update(chunk_results)
+
+    # whatever the searches did not match, including every ISBN of a chunk
+    # whose search failed, goes through the single lookup, which alone
+    # decides that an ISBN is missing
+    unresolved = [isbn for isbn in misses if isbn not in results]
+    for isbn, result in zip(unresolved, batch_executor.map(fetch_google_books_or_error, unresolved)):
+        results[isbn] = result
+
+    return results
+
+
+def request_google_books_chunk(chunk):
+    wanted = {normalize_isbn(isbn): isbn for isbn in chunk}
+    query = " OR ".join(f"isbn:{isbn}" for isbn in chunk)
+    try:
+        items = call_upstream("google_books", get_json, 'https://www.googleapis.com/books/v1/volumes', {"q": query, "maxResults": GOOGLE_BOOKS_MAX_RESULTS}).get('items', [])
+    except (requests.exceptions.RequestException, ValueError, CircuitOpenError, RateLimitExceeded):
+        return {}
+
+    results = {}
+    for item in items:
+        volume_info = item.get('volumeInfo', {})
+        for identifier in volume_info.get('industryIdentifiers', []):
+            key = normalize_isbn(identifier.get('identifier', ''))
+            if key in wanted and wanted[key] not in results:
+                results[wanted[key]] = volume_info
+                isbn_cache.set(key, volume_info)
+    return results
+
+
+def fetch_google_books_or_error(isbn):
+    try:
+        return fetch_google_books(isbn)
+    except Exception as e:
+        return e
+
+
+def indexed_language(isbn):
+    # the offline index answers before the network; None means the ISBN has
+    # to be looked up online
+    if open_library_index is None:
+        return None
+    record = open_library_index.lookup(isbn)
+    if record is None:
+        return ["missing"] if config.OPENLIBRARY_INDEX_OFFLINE else None
+    return record["language"] or ["missing"]
+
+
+def fetch_open_library_languages_batch(isbns):
+    results = {}
+    for isbn in isbns:
+        language = indexed_language(isbn)
+        if language is not None:
+            results[isbn] = language
+
+    online = [isbn for isbn in isbns if isbn not in results]
+    for chunk_results in batch_executor.map(request_open_library_chunk, chunked(online, config.OPEN_LIBRARY_BATCH_SIZE)):
+        results.update(chunk_results)
+
+    unresolved = [isbn for isbn in isbns if isbn not in results]
+    for isbn, language in zip(unresolved, batch_executor.map(fetch_open_library_language, unresolved)):
+        results[isbn] = language
+
+    return results
+
+
+def request_open_library_chunk(chunk):
+    bibkeys = ",".join(f"ISBN:{isbn}" for isbn in chunk)
+    try:
+        records = call_upstream("open_library", get_json, 'https://openlibrary.org/api/books', {"bibkeys": bibkeys, "format": "json", "jscmd": "details"})
+    except (requests.exceptions.RequestException, ValueError, CircuitOpenError):
+        return {}
+
+    results = {}
+    for isbn in chunk:
+        record = records.get(f"ISBN:{isbn}")
+        if record is None:
+            continue
+        languages = record.get('details', {}).get('languages', [])
+        codes = [language['key'].rsplit('/', 1)[-1] for language in languages if 'key' in language]
+        results[isbn] = codes or ["missing"]
+    return results
+
+
+def fetch_open_library_language(isbn):
+    language = indexed_language(isbn)
+    if language is not None:
+        return language
+
+    return list(open_library_flight.do(normalize_isbn(isbn), request_open_library_language, isbn))
+
+
+def request_open_library_language(isbn):
+    open_library_url = f'https://openlibrary.org/search.json?q={isbn}&fields=key,title,author_name,language'
+    try:
+        open_lib_data = call_upstream("open_library", get_json, open_library_url).get('docs', [])
+
+        if not open_lib_data:
+            return ["missing"]
+        return open_lib_data[0].get("language", ["missing"])
+    except (requests.exceptions.RequestException, ValueError, CircuitOpenError):
+        return ["missing"]
+
+
+def summary_key(title, authors):
+    normalized = [" ".join(str(value).lower().split()) for value in (title, authors)]
+    return hashlib.sha256("\x1f".join(normalized).encode("utf-8")).hexdigest()
+
+
+def generate_summary(title, authors):
+    key = summary_key(title, authors)
+    summary = summary_cache.get(key)
+    if summary is not None:
+        return summary
+
+    return summary_flight.do(key, request_cached_summary, title, authors, key)
+
+
+def refresh_summary(title, authors):
+    # regenerates even when a cached summary exists
+    key = summary_key(title, authors)
+    return summary_flight.do(key, request_cached_summary, title, authors, key)
+
+
+def request_cached_summary(title, authors, key):
+    summary = call_upstream("gemini", request_summary, title, authors)
+    summary_cache.set(key, summary)
+    return summary
+
+
+def request_summary(title, authors):
+    return summarizer.summarize(title, authors)
+
+
+def generate_summaries_batch(books):
+    # summarizes (title, authors) pairs through the cache and chunked batch
+    # prompts; the result holds a summary or the exception for each pair
+    keys = [summary_key(title, authors) for title, authors in books]
+    results = [summary_cache.get(key) for key in keys]
+    misses = [index for index, summary in enumerate(results) if summary is None]
+
+    chunks = chunked(misses, config.GEMINI_BATCH_SIZE)
+    for chunk, summaries in zip(chunks, batch_executor.map(request_summary_chunk, [[books[index] for index in chunk] for chunk in chunks])):
+        for index, summary in zip(chunk, summaries):
+            results[index] = summary
+            if not isinstance(summary, Exception):
+                summary_cache.set(keys[index], summary)
+
+    return results
+
+
+def request_summary_chunk(chunk):
+    # transport, quota and API errors fail the whole chunk rather than
+    # turning one failed call into a call per book
+    try:
+        return call_upstream("gemini", summarizer.summarize_batch, chunk)
+    except ValueError:
+        pass
+    except Exception as e:
+        return [e] * len(chunk)
+
+    # the batch answer could not be parsed; fall back to one prompt per book
+    summaries = []
+    for title, authors in chunk:
+        try:
+            summaries.append(generate_summary(title, authors))
+        except Exception as e:
+            summaries.append(e)
+    return summaries
+
+
+def timed(timings, stage, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = (time.perf_counter() - start) * 1000
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{stage};dur={duration:.1f}" for stage, duration in timings.items())
+
+
+class Enrichment:
+    # runs the Google Books and OpenLibrary lookups side by side; Gemini only
+    # waits for Google Books since it needs the authors
+    def __init__(self, isbn):
+        self.isbn = isbn
+        self.timings = {}
+        self.started = time.perf_counter()
+        self.google_future = executor.submit(timed, self.timings, "google_books", fetch_google_books, isbn)
+        self.open_library_future = executor.submit(timed, self.timings, "open_library", fetch_open_library_language, isbn)
+
+    def google_books_data(self):
+        return self.google_future.result()
+
+    def language(self):
+        return self.open_library_future.result()
+
+    def summary(self, title, authors):
+        return timed(self.timings, "gemini", generate_summary, title, authors)
+
+    def cancel(self):
+        self.open_library_future.cancel()
+
+    def finish(self):
+        self.timings["total"] = (time.perf_counter() - self.started) * 1000
+        return self.timings
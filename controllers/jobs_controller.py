@@ -0,0 +1,83 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import jsonify
+import config
+
+job_executor = ThreadPoolExecutor(max_workers=config.JOB_WORKERS, thread_name_prefix="jobs")
+jobs = OrderedDict()
+jobs_lock = threading.Lock()
+pending_jobs = 0
+
+
+def submit_job(book_id, fn, *args):
+    global pending_jobs
+    with jobs_lock:
+        if pending_jobs >= config.JOB_QUEUE_SIZE:
+            return None
+        pending_jobs += 1
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "book_id": book_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "status_code": None,
+            "timings": None
+        }
+        jobs[job["id"]] = job
+        evict_finished_jobs()
+
+    job_executor.submit(run_job, job, fn, *args)
+    return job
+
+
+def run_job(job, fn, *args):
+    global pending_jobs
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    try:
+        _, job["timings"] = fn(*args)
+        job["status"] = "succeeded"
+        job["status_code"] = 201
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = getattr(e, "message", str(e))
+        job["status_code"] = getattr(e, "status_code", 500)
+    finally:
+        job["finished_at"] = time.time()
+        with jobs_lock:
+            pending_jobs -= 1
+
+
+def evict_finished_jobs():
+    # keep a bounded history of finished jobs; queued and running jobs stay
+    finished = [job_id for job_id, job in jobs.items() if job["finished_at"] is not None]
+    for job_id in finished[:max(0, len(jobs) - config.JOB_HISTORY_SIZE)]:
+        del jobs[job_id]
+
+
+def get_job(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"message": "Job not found"}), 404
+        return jsonify(dict(job)), 200
+
+
+def job_stats():
+    with jobs_lock:
+        statuses = {}
+        for job in jobs.values():
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        return {
+            "pending": pending_jobs,
+            "queue_size": config.JOB_QUEUE_SIZE,
+            "workers": config.JOB_WORKERS,
+            "tracked": statuses
+        }
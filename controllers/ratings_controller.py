@@ -1,21 +1,19 @@
-from collections import defaultdict
 from flask import jsonify
-from data.database import ratings
+from data.database import repository
 from flask import jsonify, current_app as app
 
 
 def get_ratings(query_id=None):
-    filtered_ratings = [rating.to_dict() for rating in ratings if not query_id or rating.id == query_id]
+    if query_id:
+        rating = repository.find_rating(query_id)
+        filtered_ratings = [rating.to_dict()] if rating else []
+    else:
+        filtered_ratings = [rating.to_dict() for rating in repository.all_ratings()]
     return jsonify(filtered_ratings), 200
 
 
 def get_book_ratings(book_id):
-    rating_entry = None
-
-    for rating in ratings:
-        if rating.id == book_id:
-            rating_entry = rating
-            break
+    rating_entry = repository.find_rating(book_id)
 
     if rating_entry:
         return jsonify(rating_entry.to_dict()), 200
@@ -24,45 +22,27 @@ def get_book_ratings(book_id):
     
 
 def add_rating(book_id, value):
-    rating_entry = None
-
-    for rating in ratings:
-        if rating.id == book_id:
-            rating_entry = rating
-            break
+    rating_entry = repository.find_rating(book_id)
 
     if not rating_entry:
         return jsonify({"error": "Book not found"}), 404
 
-    if value not in {1, 2, 3, 4, 5}:
+    # bools and floats such as true or 5.0 compare equal to ints, so the
+    # type is checked before the value reaches the store
+    if type(value) is not int or value not in {1, 2, 3, 4, 5}:
         return jsonify({"error": "Invalid rating value. Must be an integer between 1 and 5"}), 422
 
-    rating_entry.add_value(value)
+    # the returned rating includes every value added concurrently
+    rating_entry = repository.add_rating_value(rating_entry, value)
+    if rating_entry is None:
+        return jsonify({"error": "Book not found"}), 404
 
     return jsonify({"new_average_rating": rating_entry.average}), 201
 
 
-def get_top_books(ratings):
+def get_top_books():
     try:
-        eligible_books = [rating for rating in ratings if len(rating.values) >= 3]
-
-        if not eligible_books:
-            return jsonify([])
-
-        rating_groups = defaultdict(list)
-        for book in eligible_books:
-            rating_groups[book.average].append(book)
-
-        top_ratings = sorted(rating_groups.keys(), reverse=True)[:3]
-
-        top_books = []
-        for rating in top_ratings:
-            top_books.extend(rating_groups[rating])
-
-        sorted_books_dicts = [book.to_dict() for book in top_books]
-        return jsonify(sorted_books_dicts)
+        return jsonify([rating.to_dict() for rating in repository.top_ratings()])
 
     except Exception as e:
         return jsonify({"error": "Failed to retrieve top books"})
-
-
@@ -0,0 +1,26 @@
+from flask import jsonify
+from data.database import repository
+from controllers.jobs_controller import job_stats
+from util.hedging import hedge_stats
+from util.http_client import http_client
+from controllers.enrichment import open_library_index, breakers, rate_limiters, isbn_cache, negative_isbn_cache, summary_cache, google_books_flight, open_library_flight, summary_flight
+
+
+def get_status():
+    return jsonify({
+        "isbn_cache": isbn_cache.stats(),
+        "negative_isbn_cache": dict(negative_isbn_cache.stats(), saved_upstream_calls=negative_isbn_cache.hits),
+        "summary_cache": summary_cache.stats(),
+        "single_flight": {
+            "google_books": google_books_flight.stats(),
+            "open_library": open_library_flight.stats(),
+            "summary": summary_flight.stats()
+        },
+        "http": http_client.stats(),
+        "jobs": job_stats(),
+        "circuit_breakers": {name: breaker.stats() for name, breaker in breakers.items()},
+        "hedging": hedge_stats.stats(),
+        "rate_limiters": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+        "open_library_index": open_library_index.stats() if open_library_index else None,
+        "storage": repository.stats()
+    }), 200
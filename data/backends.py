@@ -0,0 +1,24 @@
+import config
+from data.durable_repository import DurableMemoryRepository
+from data.memory_repository import MemoryRepository
+from data.remote_repository import RemoteRepository
+from data.sqlite_repository import SqliteRepository
+
+
+def create_repository(backend=config.STORAGE_BACKEND):
+    if backend == "memory" and config.MEMORY_STORE_DIR:
+        return DurableMemoryRepository(
+            config.MEMORY_STORE_DIR,
+            columnar=config.COLUMNAR_CATALOG,
+            commit_interval=config.WAL_COMMIT_INTERVAL_MS / 1000,
+            snapshot_interval=config.SNAPSHOT_INTERVAL,
+            snapshot_min_records=config.SNAPSHOT_MIN_RECORDS
+        )
+    if backend == "memory":
+        return MemoryRepository(columnar=config.COLUMNAR_CATALOG)
+    if backend == "sqlite":
+        return SqliteRepository(config.SQLITE_STORE_PATH)
+    if backend == "remote":
+        return RemoteRepository(config.STORE_SOCKET_PATH, config.REMOTE_CACHE_MAX_SIZE)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+
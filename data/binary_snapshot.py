@@ -0,0 +1,293 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections import defaultdict
+from itertools import accumulate, chain
+from data.bitmap import CONTAINER_BITS, Bitmap, from_sorted
+from data.indexes import BitmapIndex, value_keys
+from models.book import Book, intern_field
+from models.rating import Rating
+
+# layout: header | one fixed-width row per book | string offsets | string
+# data | rating values | tables; rows refer to strings by index, so repeated
+# genres, publishers and language lists are stored once. The tables are a
+# JSON document (book ids, ISBNs and the secondary index keys) followed by a
+# blob of index postings, so a load restores the store without decoding rows
+MAGIC = b"BOOKSNP2"
+HEADER = struct.Struct("<8sQQQQQQQQQ")
+# snapshots written before the tables existed; their rows are decoded on load
+V1_MAGIC = b"BOOKSNP1"
+V1_HEADER = struct.Struct("<8sQQQQQQQ")
+FIELDS = ("id", "ISBN", "title", "genre", "authors", "publisher", "publishedDate", "language", "summary")
+FIELD_POSITIONS = {field: position for position, field in enumerate(FIELDS)}
+# fields the memory store indexes, decoded when a version 1 snapshot is loaded
+KEY_FIELDS = ("id", "ISBN", "genre", "authors", "publisher", "publishedDate", "language")
+# field string ids, field encodings, rating title id, values offset, value
+# count, values total
+ROW = struct.Struct("<9IIIQII")
+OFFSET = struct.Struct("<Q")
+RATING = struct.Struct("<IQII")
+RATING_AT = 9 * 4 + 4
+
+CONTAINER_BYTES = CONTAINER_BITS // 8
+
+# two bits per field: how the string holds the value
+RAW, LIST, JSON = 0, 1, 2
+LIST_SEPARATOR = "\x1f"
+
+# these are mostly unique, so decoding them is not cached
+UNCACHED_FIELDS = {"id", "ISBN", "title", "summary"}
+
+
+def encode_value(value):
+    if isinstance(value, str):
+        return RAW, value
+    if isinstance(value, (list, tuple)) and all(isinstance(element, str) and LIST_SEPARATOR not in element for element in value):
+        return LIST, LIST_SEPARATOR.join(value)
+    return JSON, json.dumps(value)
+
+
+def decode_value(encoding, text):
+    if encoding == RAW:
+        return text
+    if encoding == LIST:
+        return text.split(LIST_SEPARATOR) if text else []
+    return json.loads(text)
+
+
+def field_value(book, field):
+    # reads a field without materializing it on a mapped book
+    if isinstance(book, MappedBook):
+        return book.peek(field)
+    return getattr(book, field)
+
+
+def rating_parts(rating):
+    if isinstance(rating, MappedRating):
+        return rating.peek()
+    return rating.title, rating.values.tobytes(), rating.total
+
+
+def index_tables(indexes, postings):
+    # bitmap indexes keep their containers, the others a flat array of rows
+    # with a count per key; blob offsets are relative to the end of the JSON
+    tables = {}
+    blob = bytearray()
+
+    def stored(data):
+        blob.extend(data)
+        return [len(blob) - len(data), len(data)]
+
+    for name, index in indexes.items():
+        keyed = postings[name]
+        if isinstance(index, BitmapIndex):
+            bitmaps = {}
+            for key, rows in keyed.items():
+                containers = from_sorted(rows).containers
+                bitmaps[key] = [
+                    [high, True] + stored(container.to_bytes(CONTAINER_BYTES, "little")) if isinstance(container, int) else [high, False] + stored(container.tobytes())
+                    for high, container in sorted(containers.items())
+                ]
+            tables[name] = {"bitmaps": bitmaps}
+        else:
+            keys = list(keyed)
+            rows = array("I", chain.from_iterable(keyed[key] for key in keys))
+            tables[name] = {"keys": keys, "counts": [len(keyed[key]) for key in keys], "rows": stored(rows.tobytes())}
+    return tables, blob
+
+
+def write_snapshot(path, segment, max_id, books, ratings, indexes):
+    # books and ratings are parallel lists, indexes the store's secondary
+    # indexes (only their fields are read); written to a temporary file and
+    # renamed into place
+    string_ids = {}
+    strings = []
+
+    def string_id(text):
+        sid = string_ids.get(text)
+        if sid is None:
+            sid = string_ids[text] = len(strings)
+            strings.append(text.encode("utf-8"))
+        return sid
+
+    rows = bytearray()
+    values = bytearray()
+    book_ids = []
+    isbns = []
+    postings = {name: defaultdict(list) for name in indexes}
+    for row, (book, rating) in enumerate(zip(books, ratings)):
+        ids = []
+        encodings = 0
+        fields = [field_value(book, field) for field in FIELDS]
+        for position, value in enumerate(fields):
+            encoding, text = encode_value(value)
+            ids.append(string_id(text))
+            encodings |= encoding << (2 * position)
+        book_ids.append(fields[0])
+        isbns.append(fields[1])
+        for name, index in indexes.items():
+            for key in value_keys(fields[FIELD_POSITIONS[index.field]], index.multi):
+                postings[name][key].append(row)
+        title, rating_values, total = rating_parts(rating)
+        rows += ROW.pack(*ids, encodings, string_id(title), len(values), len(rating_values), total)
+        values += rating_values
+
+    offsets = array("Q", [0])
+    for data in strings:
+        offsets.append(offsets[-1] + len(data))
+
+    tables, blob = index_tables(indexes, postings)
+    tables = json.dumps({"ids": book_ids, "isbns": isbns, "indexes": tables}, separators=(",", ":")).encode("utf-8")
+
+    rows_at = HEADER.size
+    offsets_at = rows_at + len(rows)
+    strings_at = offsets_at + len(offsets) * OFFSET.size
+    values_at = strings_at + offsets[-1]
+    tables_at = values_at + len(values)
+    with open(path + ".tmp", "wb") as snapshot:
+        snapshot.write(HEADER.pack(MAGIC, segment, max_id, len(rows) // ROW.size, offsets_at, strings_at, values_at, len(values), tables_at, len(tables)))
+        snapshot.write(rows)
+        snapshot.write(offsets.tobytes())
+        for data in strings:
+            snapshot.write(data)
+        snapshot.write(values)
+        snapshot.write(tables)
+        snapshot.write(blob)
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(path + ".tmp", path)
+
+
+class MappedSnapshot:
+    # read-only mapping of a snapshot file; the pages are the OS page cache,
+    # so every worker process that maps the same file shares them
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as snapshot:
+            self.data = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = self.data[:len(MAGIC)]
+        if magic == MAGIC:
+            _, self.segment, self.max_id, self.rows, self.offsets_at, self.strings_at, self.values_at, _, self.tables_at, self.tables_size = HEADER.unpack_from(self.data)
+            self.rows_at = HEADER.size
+        elif magic == V1_MAGIC:
+            _, self.segment, self.max_id, self.rows, self.offsets_at, self.strings_at, self.values_at, _ = V1_HEADER.unpack_from(self.data)
+            self.rows_at = V1_HEADER.size
+            self.tables_at = None
+        else:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        self.cache = {}
+
+    def tables(self):
+        # book ids, ISBNs and index entries in row order, or None for a
+        # version 1 snapshot
+        if self.tables_at is None:
+            return None
+        tables = json.loads(self.data[self.tables_at:self.tables_at + self.tables_size])
+        blob_at = self.tables_at + self.tables_size
+        indexes = {name: self.index_entries(table, blob_at) for name, table in tables["indexes"].items()}
+        return tables["ids"], tables["isbns"], indexes
+
+    def index_entries(self, table, blob_at):
+        # a key's rows are sliced out of one array with C-level maps, so
+        # high-cardinality indexes cost little per key
+        if "bitmaps" in table:
+            return {key: Bitmap({high: self.container(blob_at + offset, size, dense) for high, dense, offset, size in containers})
+                    for key, containers in table["bitmaps"].items()}
+        offset, size = table["rows"]
+        rows = array("I")
+        rows.frombytes(self.data[blob_at + offset:blob_at + offset + size])
+        ends = list(accumulate(table["counts"]))
+        return dict(zip(table["keys"], map(set, map(rows.__getitem__, map(slice, [0] + ends[:-1], ends)))))
+
+    def container(self, start, size, dense):
+        if dense:
+            return int.from_bytes(self.data[start:start + size], "little")
+        container = array("H")
+        container.frombytes(self.data[start:start + size])
+        return container
+
+    def string(self, sid):
+        start = OFFSET.unpack_from(self.data, self.offsets_at + sid * OFFSET.size)[0]
+        end = OFFSET.unpack_from(self.data, self.offsets_at + (sid + 1) * OFFSET.size)[0]
+        return self.data[self.strings_at + start:self.strings_at + end].decode("utf-8")
+
+    def fields(self, row, names):
+        # decoded values of several fields of one row; repeated values come
+        # from the cache already interned
+        ids = ROW.unpack_from(self.data, self.rows_at + row * ROW.size)
+        values = []
+        for name in names:
+            position = FIELD_POSITIONS[name]
+            sid, encoding = ids[position], ids[9] >> (2 * position) & 3
+            if name in UNCACHED_FIELDS:
+                values.append(decode_value(encoding, self.string(sid)))
+                continue
+            value = self.cache.get((sid, encoding))
+            if value is None:
+                value = self.cache[(sid, encoding)] = intern_field(decode_value(encoding, self.string(sid)))
+            values.append(value)
+        return values
+
+    def rating(self, row):
+        # (title, values bytes, total)
+        title_id, offset, count, total = RATING.unpack_from(self.data, self.rows_at + row * ROW.size + RATING_AT)
+        start = self.values_at + offset
+        return self.string(title_id), self.data[start:start + count], total
+
+
+class MappedBook(Book):
+    # a book backed by a snapshot row; each field is decoded on first access
+    # and kept, updates simply overwrite it
+    __slots__ = ("source", "row")
+
+    def __init__(self, source, row):
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "row", row)
+
+    def __getattr__(self, name):
+        if name not in FIELD_POSITIONS:
+            raise AttributeError(name)
+        self.load((name,))
+        return object.__getattribute__(self, name)
+
+    def load(self, names):
+        for name, value in zip(names, self.source.fields(self.row, names)):
+            object.__setattr__(self, name, value)
+
+    def peek(self, field):
+        try:
+            return object.__getattribute__(self, field)
+        except AttributeError:
+            return self.source.fields(self.row, (field,))[0]
+
+
+class MappedRating(Rating):
+    # a rating backed by a snapshot row; title, values and total are copied
+    # out of the mapping on first access
+    __slots__ = ("source", "row")
+
+    def __init__(self, book_id, source, row):
+        object.__setattr__(self, "id", book_id)
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "row", row)
+
+    def __getattr__(self, name):
+        if name not in ("title", "values", "total"):
+            raise AttributeError(name)
+        title, values, total = self.source.rating(self.row)
+        for field, value in (("title", title), ("values", array("B", values)), ("total", total)):
+            try:
+                object.__getattribute__(self, field)
+            except AttributeError:
+                object.__setattr__(self, field, value)
+        return object.__getattribute__(self, name)
+
+    def peek(self):
+        # (title, values bytes, total) without copying them out
+        try:
+            values = object.__getattribute__(self, "values")
+        except AttributeError:
+            return self.source.rating(self.row)
+        return self.title, values.tobytes(), self.total
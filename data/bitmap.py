@@ -0,0 +1,160 @@
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+
+# roaring-style compressed bitmap: values are split by their high 16 bits
+# into containers that hold the low 16 bits either as a sorted array (sparse)
+# or as a 65536-bit integer (dense)
+ARRAY_LIMIT = 4096
+CONTAINER_BITS = 1 << 16
+BYTE_POSITIONS = [[bit for bit in range(8) if byte >> bit & 1] for byte in range(256)]
+
+if hasattr(int, "bit_count"):
+    def popcount(value):
+        return value.bit_count()
+else:
+    def popcount(value):
+        return bin(value).count("1")
+
+
+def to_dense(container):
+    if isinstance(container, int):
+        return container
+    dense = 0
+    for low in container:
+        dense |= 1 << low
+    return dense
+
+
+def dense_positions(dense):
+    positions = []
+    for offset, byte in enumerate(dense.to_bytes(CONTAINER_BITS // 8, "little")):
+        if byte:
+            base = offset * 8
+            positions.extend(base + bit for bit in BYTE_POSITIONS[byte])
+    return positions
+
+
+def compact(dense):
+    # keeps a container in its cheaper representation
+    if popcount(dense) <= ARRAY_LIMIT:
+        return array("H", dense_positions(dense))
+    return dense
+
+
+def container_len(container):
+    return popcount(container) if isinstance(container, int) else len(container)
+
+
+def container_and(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        return compact(left & right)
+    if isinstance(left, int):
+        left, right = right, left
+    if isinstance(right, int):
+        return array("H", (low for low in left if right >> low & 1))
+    return array("H", sorted(set(left).intersection(right)))
+
+
+def container_or(left, right):
+    if isinstance(left, int) or isinstance(right, int) or len(left) + len(right) > ARRAY_LIMIT:
+        return compact(to_dense(left) | to_dense(right))
+    return array("H", sorted(set(left).union(right)))
+
+
+class Bitmap:
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    def add(self, value):
+        high, low = value >> 16, value & 0xFFFF
+        container = self.containers.get(high)
+        if container is None:
+            self.containers[high] = array("H", [low])
+        elif isinstance(container, int):
+            self.containers[high] = container | 1 << low
+        else:
+            position = bisect_left(container, low)
+            if position < len(container) and container[position] == low:
+                return
+            container.insert(position, low)
+            if len(container) > ARRAY_LIMIT:
+                self.containers[high] = to_dense(container)
+
+    def discard(self, value):
+        high, low = value >> 16, value & 0xFFFF
+        container = self.containers.get(high)
+        if container is None:
+            return
+        if isinstance(container, int):
+            container = compact(container & ~(1 << low))
+        else:
+            position = bisect_left(container, low)
+            if position < len(container) and container[position] == low:
+                del container[position]
+        if container_len(container):
+            self.containers[high] = container
+        else:
+            del self.containers[high]
+
+    def __contains__(self, value):
+        container = self.containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        position = bisect_left(container, low)
+        return position < len(container) and container[position] == low
+
+    def __and__(self, other):
+        containers = {}
+        for high in self.containers.keys() & other.containers.keys():
+            container = container_and(self.containers[high], other.containers[high])
+            if container_len(container):
+                containers[high] = container
+        return Bitmap(containers)
+
+    def __or__(self, other):
+        containers = {high: copy(container) for high, container in self.containers.items()}
+        for high, container in other.containers.items():
+            containers[high] = container_or(containers[high], container) if high in containers else copy(container)
+        return Bitmap(containers)
+
+    def __len__(self):
+        return sum(container_len(container) for container in self.containers.values())
+
+    def __iter__(self):
+        for high in sorted(self.containers):
+            container = self.containers[high]
+            base = high << 16
+            lows = dense_positions(container) if isinstance(container, int) else container
+            for low in lows:
+                yield base + low
+
+    def memory_bytes(self):
+        return sum(
+            CONTAINER_BITS // 8 if isinstance(container, int) else container.itemsize * len(container)
+            for container in self.containers.values()
+        )
+
+
+def from_sorted(values):
+    # builds a bitmap from ascending values without growing containers one
+    # value at a time
+    containers = {}
+    for high, group in groupby(values, key=lambda value: value >> 16):
+        lows = [value & 0xFFFF for value in group]
+        if len(lows) <= ARRAY_LIMIT:
+            containers[high] = array("H", lows)
+        else:
+            bits = bytearray(CONTAINER_BITS // 8)
+            for low in lows:
+                bits[low >> 3] |= 1 << (low & 7)
+            containers[high] = int.from_bytes(bits, "little")
+    return Bitmap(containers)
+
+
+def copy(container):
+    return container if isinstance(container, int) else array("H", container)
+
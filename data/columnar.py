@@ -0,0 +1,140 @@
+import threading
+from collections import defaultdict
+from data.indexes import index_keys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INITIAL_CAPACITY = 1024
+
+
+def resized(column, capacity):
+    grown = np.zeros(capacity, dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
+
+
+class DictionaryColumn:
+    # one book field stored as integer codes into a dictionary of its distinct
+    # (lower-cased) values; a multi-valued field gets one code per distinct
+    # combination of elements and `members` maps each element to its codes
+    def __init__(self, field, multi, capacity):
+        self.field = field
+        self.multi = multi
+        self.codes = np.zeros(capacity, dtype=np.int32)
+        self.dictionary = {}
+        self.members = defaultdict(list)
+
+    def encode(self, book):
+        keys = frozenset(index_keys(book, self.field, self.multi))
+        code = self.dictionary.get(keys)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary[keys] = code
+            for key in keys:
+                self.members[key].append(code)
+        return code
+
+    def grow(self, capacity):
+        self.codes = resized(self.codes, capacity)
+
+    def match(self, values, size):
+        # mask of the first `size` ordinals holding any of the values
+        codes = {code for value in values for code in self.members.get(value.lower(), ())}
+        if not codes:
+            return np.zeros(size, dtype=bool)
+        if len(codes) == 1:
+            return self.codes[:size] == codes.pop()
+        return np.isin(self.codes[:size], list(codes))
+
+
+class ColumnarCatalog:
+    # column-per-field copy of the catalog indexed by book ordinal, kept in
+    # step with the dict store on every write; filters and rating aggregates
+    # are evaluated as NumPy masks instead of walking Book objects
+    def __init__(self, fields, capacity=INITIAL_CAPACITY):
+        if np is None:
+            raise RuntimeError("The columnar catalog requires numpy")
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.size = 0
+        self.live = np.zeros(capacity, dtype=bool)
+        self.columns = {field: DictionaryColumn(field, multi, capacity) for field, multi in fields.items()}
+        self.rating_counts = np.zeros(capacity, dtype=np.int64)
+        self.rating_sums = np.zeros(capacity, dtype=np.float64)
+        self.rating_averages = np.zeros(capacity, dtype=np.float64)
+
+    def ensure_capacity(self, ordinal):
+        if ordinal < self.capacity:
+            return
+        capacity = max(ordinal + 1, self.capacity * 2)
+        self.live = resized(self.live, capacity)
+        self.rating_counts = resized(self.rating_counts, capacity)
+        self.rating_sums = resized(self.rating_sums, capacity)
+        self.rating_averages = resized(self.rating_averages, capacity)
+        for column in self.columns.values():
+            column.grow(capacity)
+        self.capacity = capacity
+
+    def add(self, ordinal, book, rating):
+        with self.lock:
+            self.ensure_capacity(ordinal)
+            self.live[ordinal] = True
+            for column in self.columns.values():
+                column.codes[ordinal] = column.encode(book)
+            self.rating_counts[ordinal] = len(rating.values)
+            self.rating_sums[ordinal] = rating.total
+            self.rating_averages[ordinal] = rating.average
+            self.size = max(self.size, ordinal + 1)
+
+    def update(self, ordinal, book):
+        with self.lock:
+            for column in self.columns.values():
+                column.codes[ordinal] = column.encode(book)
+
+    def remove(self, ordinal):
+        with self.lock:
+            self.live[ordinal] = False
+
+    def add_rating(self, ordinal, value):
+        with self.lock:
+            self.rating_counts[ordinal] += 1
+            self.rating_sums[ordinal] += value
+            self.rating_averages[ordinal] = self.rating_sums[ordinal] / self.rating_counts[ordinal]
+
+    def mask(self, filters):
+        # filters is a list of (field, alternatives) pairs over indexed columns
+        with self.lock:
+            mask = self.live[:self.size].copy()
+            for field, values in filters:
+                mask &= self.columns[field].match(values, self.size)
+            return mask
+
+    def ordinals(self, filters):
+        return np.flatnonzero(self.mask(filters)).tolist()
+
+    def count(self, filters):
+        return int(np.count_nonzero(self.mask(filters)))
+
+    def top_rated(self, min_count, groups):
+        # ordinals of the books holding the `groups` highest averages among
+        # books with at least `min_count` ratings, best average first
+        with self.lock:
+            eligible = self.live[:self.size] & (self.rating_counts[:self.size] >= min_count)
+            averages = self.rating_averages[:self.size]
+            ordinals = []
+            for average in np.unique(averages[eligible])[::-1][:groups]:
+                ordinals.extend(np.flatnonzero(eligible & (averages == average)).tolist())
+            return ordinals
+
+    def stats(self):
+        with self.lock:
+            arrays = [self.live, self.rating_counts, self.rating_sums, self.rating_averages] + [column.codes for column in self.columns.values()]
+            return {
+                "books": int(np.count_nonzero(self.live[:self.size])),
+                "capacity": self.capacity,
+                "dictionary_sizes": {field: len(column.dictionary) for field, column in self.columns.items()},
+                "memory_bytes": sum(array.nbytes for array in arrays)
+            }
@@ -1,2 +1,4 @@
-books = []
-ratings = []
+from data.backends import create_repository
+
+# the store every controller goes through
+repository = create_repository()
@@ -0,0 +1,259 @@
+import fcntl
+import gc
+import os
+import threading
+import time
+from itertools import repeat
+from data.binary_snapshot import KEY_FIELDS, MappedBook, MappedRating, MappedSnapshot, write_snapshot
+from data.memory_repository import MemoryRepository
+from data.write_ahead_log import WriteAheadLog, WriteAheadLogError, read_segment, segment_number
+from models.book import Book
+from models.rating import Rating
+
+SNAPSHOT_NAME = "snapshot-{:08d}.bin"
+LOCK_NAME = "LOCK"
+
+
+class StoreDirectoryLockedError(Exception):
+    pass
+
+
+def snapshot_number(name):
+    if name.startswith("snapshot-") and name.endswith(".bin"):
+        try:
+            return int(name[9:-4])
+        except ValueError:
+            return None
+    return None
+
+
+class DurableMemoryRepository(MemoryRepository):
+    # the memory store plus a write-ahead log of every mutation; a background
+    # compactor writes snapshots so a restart loads the latest snapshot and
+    # replays only the log segments written after it
+    #
+    # snapshots are fuzzy: the set of books is captured at the segment switch
+    # but their fields are read afterwards, so every log record is replayed
+    # idempotently (adds of known ids are skipped, updates overwrite and
+    # rating records carry the value count they produced)
+    def __init__(self, directory, columnar=False, commit_interval=0.002, snapshot_interval=300, snapshot_min_records=10000):
+        super().__init__(columnar)
+        self.directory = directory
+        self.snapshot_lock = threading.Lock()
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_min_records = snapshot_min_records
+        self.snapshots = 0
+        self.last_snapshot = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.lock_file = self.lock_directory()
+        start = time.perf_counter()
+        replayed, segment = self.recover()
+        self.recovery = {"seconds": time.perf_counter() - start, "replayed_records": replayed, "books": len(self.books)}
+        self.log = WriteAheadLog(directory, segment, commit_interval)
+
+        if snapshot_interval:
+            self.compactor = threading.Thread(target=self.compact_periodically, daemon=True)
+            self.compactor.start()
+
+    def lock_directory(self):
+        # one process owns the directory for its lifetime: two writers would
+        # interleave segments and lose books. The lock goes away with the
+        # process, so a crash leaves nothing to clean up
+        path = os.path.join(self.directory, LOCK_NAME)
+        lock_file = open(path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise StoreDirectoryLockedError(
+                f"{self.directory} is in use by another process; worker processes "
+                "must share one store through the store server") from None
+        return lock_file
+
+    def files(self, number):
+        names = os.listdir(self.directory)
+        return sorted((number(name), name) for name in names if number(name) is not None)
+
+    def recover(self):
+        # returns the number of replayed records and the segment to append to
+        start_segment = 0
+        snapshots = self.files(snapshot_number)
+        if snapshots:
+            start_segment, name = snapshots[-1]
+            self.load_snapshot(os.path.join(self.directory, name))
+
+        replayed = 0
+        segments = self.files(segment_number)
+        for number, name in segments:
+            if number >= start_segment:
+                for record in read_segment(os.path.join(self.directory, name)):
+                    self.apply(record)
+                    replayed += 1
+
+        # a crash may have left a torn line, so appends start a fresh segment
+        last_segment = max([start_segment] + [number for number, _ in segments])
+        return replayed, last_segment + 1
+
+    def load_snapshot(self, path):
+        # books and ratings stay in the mapped file until a field is read;
+        # the ids, ISBNs and index entries come from the snapshot's tables,
+        # so no row is decoded here
+        snapshot = MappedSnapshot(path)
+        tables = snapshot.tables()
+        if tables is None:
+            # a version 1 snapshot: decode the indexed fields and reindex
+            for row in range(snapshot.rows):
+                book = MappedBook(snapshot, row)
+                book.load(KEY_FIELDS)
+                super().save_book(book, MappedRating(book.id, snapshot, row))
+        else:
+            book_ids, isbns, index_entries = tables
+            rows = range(snapshot.rows)
+            # none of these objects form cycles, so the collector would only
+            # rescan the growing heap while they are created
+            gc.disable()
+            try:
+                books = list(map(MappedBook, repeat(snapshot), rows))
+                ratings = list(map(MappedRating, book_ids, repeat(snapshot), rows))
+                self.restore(book_ids, isbns, books, ratings, index_entries)
+            finally:
+                gc.enable()
+        self.max_id = snapshot.max_id
+
+    def apply(self, record):
+        operation = record[0]
+        if operation == "add":
+            document, title = record[1], record[2]
+            if document["id"] not in self.books:
+                super().save_book(Book(**document), Rating(document["id"], title))
+            self.max_id = max(self.max_id, int(document["id"]))
+        elif operation == "update":
+            book = self.books.get(record[1])
+            if book is not None:
+                super().update_book(book, record[2])
+        elif operation == "summary":
+            book = self.books.get(record[1])
+            if book is not None:
+                super().update_book(book, {"summary": record[2]})
+        elif operation == "rate":
+            rating = self.ratings.get(record[1])
+            if rating is not None and len(rating.values) < record[3]:
+                super().add_rating_value(rating, record[2])
+        elif operation == "delete":
+            super().remove_book(record[1])
+        elif operation == "clear":
+            super().clear()
+
+    def logged(self, record):
+        # enqueued under the locks that ordered the mutation, so log order
+        # matches the order the mutations were applied in. Rating values
+        # hold only their stripe, so an add also holds the stripe of the new
+        # book until its record is enqueued and no rate record can precede
+        # it. Mutations call self.log.check() first, so once the log has
+        # failed they are rejected before they change the store
+        return self.log.enqueue(record)
+
+    def save_book(self, book, rating):
+        with self.lock, self.rating_lock(book.id):
+            self.log.check()
+            super().save_book(book, rating)
+            sequence = self.logged(["add", book.to_dict(), rating.title])
+        self.log.wait(sequence)
+
+    def update_book(self, book, fields):
+        with self.lock:
+            self.log.check()
+            updated = super().update_book(book, fields)
+            if updated is None:
+                return None
+            sequence = self.logged(["update", book.id, fields])
+        self.log.wait(sequence)
+        return updated
+
+    def store_summary(self, book, title, authors, summary):
+        with self.lock:
+            self.log.check()
+            updated = super().store_summary(book, title, authors, summary)
+            if updated is None:
+                return None
+            sequence = self.logged(["summary", book.id, summary])
+        self.log.wait(sequence)
+        return updated
+
+    def add_rating_value(self, rating, value):
+        with self.rating_lock(rating.id):
+            self.log.check()
+            updated = super().add_rating_value(rating, value)
+            if updated is None:
+                return None
+            sequence = self.logged(["rate", rating.id, value, len(updated.values)])
+        self.log.wait(sequence)
+        return updated
+
+    def remove_book(self, book_id):
+        with self.lock:
+            self.log.check()
+            book = super().remove_book(book_id)
+            if book is None:
+                return None
+            sequence = self.logged(["delete", book_id])
+        self.log.wait(sequence)
+        return book
+
+    def clear(self):
+        # MemoryRepository.__init__ clears the store before the log exists
+        if not hasattr(self, "log"):
+            return super().clear()
+        with self.lock:
+            self.log.check()
+            super().clear()
+            sequence = self.logged(["clear"])
+        self.log.wait(sequence)
+
+    def snapshot(self):
+        # switches to a new log segment, writes every book to a binary
+        # snapshot, then drops the segments and snapshots it covers
+        with self.snapshot_lock:
+            start = time.perf_counter()
+            with self.lock:
+                segment = self.log.rotate()
+                books = list(self.books.values())
+                ratings = list(self.ratings.values())
+                max_id = self.max_id
+
+            write_snapshot(os.path.join(self.directory, SNAPSHOT_NAME.format(segment)), segment, max_id, books, ratings, self.secondary_indexes)
+
+            for number, name in self.files(snapshot_number) + self.files(segment_number):
+                if number < segment:
+                    os.remove(os.path.join(self.directory, name))
+
+            self.snapshots += 1
+            self.last_snapshot = {"segment": segment, "books": len(books), "seconds": time.perf_counter() - start, "at": time.time()}
+            return self.last_snapshot
+
+    def compact_periodically(self):
+        while True:
+            time.sleep(self.snapshot_interval)
+            if self.log.stats()["records_in_segment"] >= self.snapshot_min_records:
+                try:
+                    self.snapshot()
+                except (OSError, WriteAheadLogError):
+                    pass
+
+    def close(self):
+        # waits for the logged mutations and hands the directory over, as
+        # process exit would; the repository is not written to afterwards
+        self.log.wait(self.log.appended)
+        self.lock_file.close()
+
+    def stats(self):
+        return dict(
+            super().stats(),
+            backend="durable_memory",
+            directory=self.directory,
+            log=self.log.stats(),
+            recovery=self.recovery,
+            snapshots=self.snapshots,
+            last_snapshot=self.last_snapshot
+        )
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from data.bitmap import Bitmap
+
+
+def index_keys(book, field, multi):
+    # normalized (lower-cased) keys a book is indexed under for one field
+    return value_keys(getattr(book, field, ''), multi)
+
+
+def value_keys(value, multi):
+    if multi:
+        return {str(element).lower() for element in value}
+    return {str(value).lower()}
+
+
+class SecondaryIndex:
+    # maps the normalized (lower-cased) value of one book field to the set of
+    # book ordinals holding it; multi-valued fields index every element
+    def __init__(self, field, multi=False):
+        self.field = field
+        self.multi = multi
+        self.entries = defaultdict(set)
+
+    def keys(self, book):
+        return index_keys(book, self.field, self.multi)
+
+    def add(self, ordinal, book):
+        for key in self.keys(book):
+            self.entries[key].add(ordinal)
+
+    def remove(self, ordinal, book):
+        for key in self.keys(book):
+            ordinals = self.entries.get(key)
+            if ordinals is not None:
+                ordinals.discard(ordinal)
+                if not ordinals:
+                    del self.entries[key]
+
+    def lookup(self, value):
+        return self.entries.get(value.lower(), set())
+
+    def stats(self):
+        return {"field": self.field, "keys": len(self.entries)}
+
+
+class BitmapIndex(SecondaryIndex):
+    # same keys as SecondaryIndex but each key holds a compressed bitmap of
+    # ordinals; meant for low-cardinality fields such as genre and language
+    def __init__(self, field, multi=False):
+        super().__init__(field, multi)
+        self.entries = defaultdict(Bitmap)
+
+    def remove(self, ordinal, book):
+        for key in self.keys(book):
+            bitmap = self.entries.get(key)
+            if bitmap is not None:
+                bitmap.discard(ordinal)
+                if not bitmap.containers:
+                    del self.entries[key]
+
+    def lookup(self, value):
+        return self.entries.get(value.lower(), Bitmap())
+
+    def lookup_any(self, values):
+        result = Bitmap()
+        for value in values:
+            result = result | self.lookup(value)
+        return result
+
+    def stats(self):
+        return {
+            "field": self.field,
+            "keys": len(self.entries),
+            "counts": {key: len(bitmap) for key, bitmap in self.entries.items()},
+            "memory_bytes": sum(bitmap.memory_bytes() for bitmap in self.entries.values())
+        }
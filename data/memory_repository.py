@@ -0,0 +1,197 @@
+import threading
+from data import query
+from data.indexes import BitmapIndex, SecondaryIndex
+from data.repository import DuplicateIsbnError, Repository
+
+
+# rating updates lock one of these stripes, picked by book id
+RATING_LOCK_STRIPES = 64
+
+
+class MemoryRepository(Repository):
+    # the catalog in process memory: books and ratings keyed by book id, a
+    # unique ISBN index and secondary indexes over book ordinals
+    #
+    # stored Book and Rating objects are never changed in place: writers
+    # store a new copy, so lookups read them without locking. `lock` guards
+    # the indexes and adds/updates/deletes; rating values only take the
+    # stripe of their book, so ratings of different books do not contend
+    def __init__(self, columnar=False):
+        self.columnar = columnar
+        self.id_lock = threading.Lock()
+        self.lock = threading.RLock()
+        self.rating_locks = [threading.RLock() for _ in range(RATING_LOCK_STRIPES)]
+        self.clear()
+
+    def rating_lock(self, book_id):
+        return self.rating_locks[hash(book_id) % RATING_LOCK_STRIPES]
+
+    def clear(self):
+        with self.lock:
+            self.reset()
+
+    def reset(self):
+        # dicts keep insertion order, so iterating the values lists the
+        # catalog in the order books were added
+        self.books = {}
+        self.ratings = {}
+        self.isbn_index = {}
+        self.max_id = 0
+
+        # every book gets an increasing ordinal; secondary indexes hold
+        # ordinals so sorting a candidate set restores insertion order
+        self.book_ordinals = {}
+        self.books_by_ordinal = {}
+        self.next_ordinal = 0
+
+        self.secondary_indexes = {
+            "genre": BitmapIndex("genre"),
+            "publisher": SecondaryIndex("publisher"),
+            "authors": SecondaryIndex("authors"),
+            "publishedDate": SecondaryIndex("publishedDate"),
+            "language": BitmapIndex("language", multi=True)
+        }
+
+        # optional NumPy copy of the indexed fields and rating aggregates
+        self.columnar_catalog = None
+        if self.columnar:
+            # numpy is only imported when the columnar catalog is enabled
+            from data.columnar import ColumnarCatalog
+            self.columnar_catalog = ColumnarCatalog({name: index.multi for name, index in self.secondary_indexes.items()})
+
+    def next_id(self):
+        with self.id_lock:
+            self.max_id += 1
+            return str(self.max_id)
+
+    def save_book(self, book, rating):
+        with self.lock:
+            if book.ISBN in self.isbn_index:
+                raise DuplicateIsbnError(book.ISBN)
+            ordinal = self.next_ordinal
+            self.next_ordinal += 1
+            self.book_ordinals[book.id] = ordinal
+            self.books_by_ordinal[ordinal] = book
+            for index in self.secondary_indexes.values():
+                index.add(ordinal, book)
+            if self.columnar_catalog is not None:
+                self.columnar_catalog.add(ordinal, book, rating)
+
+            self.ratings[rating.id] = rating
+            self.isbn_index[book.ISBN] = book.id
+            self.books[book.id] = book
+
+    def restore(self, book_ids, isbns, books, ratings, index_entries):
+        # bulk load into an empty store: books[i] gets ordinal i and
+        # index_entries holds the prebuilt entries of every secondary index
+        with self.lock:
+            self.books = dict(zip(book_ids, books))
+            self.ratings = dict(zip(book_ids, ratings))
+            self.isbn_index = dict(zip(isbns, book_ids))
+            self.book_ordinals = dict(zip(book_ids, range(len(books))))
+            self.books_by_ordinal = dict(enumerate(books))
+            self.next_ordinal = len(books)
+            for name, index in self.secondary_indexes.items():
+                index.entries.update(index_entries[name])
+            if self.columnar_catalog is not None:
+                for ordinal, (book, rating) in enumerate(zip(books, ratings)):
+                    self.columnar_catalog.add(ordinal, book, rating)
+
+    def replace_book(self, current, fields):
+        # swaps in a copy of `current` with fields applied; holds self.lock
+        updated = current.with_fields(fields)
+        # a value that cannot be indexed fails here, before anything changed;
+        # the columnar catalog encodes the same keys
+        for index in self.secondary_indexes.values():
+            index.keys(updated)
+        if updated.ISBN != current.ISBN:
+            if updated.ISBN in self.isbn_index:
+                raise DuplicateIsbnError(updated.ISBN)
+            self.isbn_index.pop(current.ISBN, None)
+            self.isbn_index[updated.ISBN] = updated.id
+
+        ordinal = self.book_ordinals[current.id]
+        for index in self.secondary_indexes.values():
+            index.remove(ordinal, current)
+            index.add(ordinal, updated)
+        if self.columnar_catalog is not None:
+            self.columnar_catalog.update(ordinal, updated)
+        self.books_by_ordinal[ordinal] = updated
+        self.books[updated.id] = updated
+        return updated
+
+    def update_book(self, book, fields):
+        with self.lock:
+            current = self.books.get(book.id)
+            if current is None:
+                return None
+            return self.replace_book(current, fields)
+
+    def store_summary(self, book, title, authors, summary):
+        with self.lock:
+            current = self.books.get(book.id)
+            if current is None or current.title != title or current.authors != authors:
+                return None
+            return self.replace_book(current, {"summary": summary})
+
+    def find_book(self, book_id):
+        return self.books.get(book_id)
+
+    def find_book_by_isbn(self, isbn):
+        book_id = self.isbn_index.get(isbn)
+        return self.books.get(book_id) if book_id is not None else None
+
+    def find_rating(self, book_id):
+        return self.ratings.get(book_id)
+
+    def add_rating_value(self, rating, value):
+        # builds on the stored rating, not on the possibly stale `rating`
+        with self.rating_lock(rating.id):
+            current = self.ratings.get(rating.id)
+            if current is None:
+                return None
+            updated = current.with_value(value)
+            if self.columnar_catalog is not None:
+                self.columnar_catalog.add_rating(self.book_ordinals[rating.id], value)
+            self.ratings[rating.id] = updated
+            return updated
+
+    def remove_book(self, book_id):
+        with self.lock, self.rating_lock(book_id):
+            book = self.books.pop(book_id, None)
+            if book is not None:
+                self.ratings.pop(book_id, None)
+                self.isbn_index.pop(book.ISBN, None)
+
+                ordinal = self.book_ordinals.pop(book_id)
+                del self.books_by_ordinal[ordinal]
+                for index in self.secondary_indexes.values():
+                    index.remove(ordinal, book)
+                if self.columnar_catalog is not None:
+                    self.columnar_catalog.remove(ordinal)
+            return book
+
+    def all_books(self):
+        # list() copies the values in one step, so a concurrent write
+        # cannot break the iteration
+        return list(self.books.values())
+
+    def all_ratings(self):
+        return list(self.ratings.values())
+
+    def query_books(self, filters):
+        return query.query_books(self, filters)
+
+    def count_books(self, filters):
+        return query.count_books(self, filters)
+
+    def top_ratings(self, min_count=3, groups=3):
+        return query.top_ratings(self, min_count, groups)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "books": len(self.books),
+            "indexes": {name: index.stats() for name, index in self.secondary_indexes.items()},
+            "columnar_catalog": self.columnar_catalog.stats() if self.columnar_catalog else None
+        }
@@ -0,0 +1,135 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from util.isbn import normalize_isbn
+
+BATCH_SIZE = 10000
+
+
+def open_dump(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def dump_records(path, record_type):
+    # OpenLibrary dumps are tab separated: type, key, revision, last_modified, JSON
+    with open_dump(path) as dump:
+        for line in dump:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) != 5 or columns[0] != record_type:
+                continue
+            try:
+                yield columns[1], json.loads(columns[4])
+            except ValueError:
+                continue
+
+
+def edition_rows(edition):
+    isbns = {normalize_isbn(isbn) for isbn in (edition.get("isbn_10") or []) + (edition.get("isbn_13") or [])}
+    if not isbns:
+        return []
+
+    author_keys = [author["key"] for author in edition.get("authors", []) if isinstance(author, dict) and "key" in author]
+    languages = [language["key"].rsplit("/", 1)[-1] for language in edition.get("languages", []) if isinstance(language, dict) and "key" in language]
+    publishers = edition.get("publishers") or []
+    row = (
+        edition.get("title"),
+        "\t".join(author_keys),
+        publishers[0] if publishers else None,
+        edition.get("publish_date"),
+        ",".join(languages)
+    )
+    return [(isbn,) + row for isbn in isbns if isbn]
+
+
+def insert_batches(db, statement, rows):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.executemany(statement, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.executemany(statement, batch)
+        count += len(batch)
+    return count
+
+
+def build_index(editions_path, output_path, authors_path=None):
+    # streams the dumps into a fresh SQLite file with bounded memory, then
+    # swaps it in place of the previous index
+    temp_path = output_path + ".building"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    db = sqlite3.connect(temp_path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute("CREATE TABLE editions (isbn TEXT PRIMARY KEY, title TEXT, author_keys TEXT, publisher TEXT, published_date TEXT, language TEXT) WITHOUT ROWID")
+    db.execute("CREATE TABLE authors (key TEXT PRIMARY KEY, name TEXT) WITHOUT ROWID")
+
+    authors = 0
+    if authors_path:
+        rows = ((key, author.get("name")) for key, author in dump_records(authors_path, "/type/author"))
+        authors = insert_batches(db, "INSERT OR REPLACE INTO authors VALUES (?, ?)", rows)
+
+    rows = (row for _, edition in dump_records(editions_path, "/type/edition") for row in edition_rows(edition))
+    isbns = insert_batches(db, "INSERT OR REPLACE INTO editions VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    db.commit()
+    db.close()
+    os.replace(temp_path, output_path)
+    return {"isbns": isbns, "authors": authors}
+
+
+class OpenLibraryIndex:
+    # read-only lookups against an index built by build_index; each thread
+    # keeps its own connection
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def connection(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self.local.db = db
+        return db
+
+    def lookup(self, isbn):
+        db = self.connection()
+        row = db.execute("SELECT title, author_keys, publisher, published_date, language FROM editions WHERE isbn = ?", (normalize_isbn(isbn),)).fetchone()
+        with self.lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            return None
+
+        title, author_keys, publisher, published_date, language = row
+        authors = []
+        for key in filter(None, author_keys.split("\t")):
+            author = db.execute("SELECT name FROM authors WHERE key = ?", (key,)).fetchone()
+            if author and author[0]:
+                authors.append(author[0])
+
+        return {
+            "title": title,
+            "authors": authors,
+            "publisher": publisher,
+            "publishedDate": published_date,
+            "language": language.split(",") if language else []
+        }
+
+    def stats(self):
+        with self.lock:
+            return {"path": self.path, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,133 @@
+from collections import defaultdict
+from data.indexes import BitmapIndex
+
+# fields that accept comma separated alternatives in GET /books
+ALTERNATIVE_FIELDS = {"genre", "language"}
+
+
+def matches(book, key, value):
+    # the exact-match semantics of GET /books for fields without an index
+    return str(getattr(book, key, '')).lower() == value.lower()
+
+
+def alternatives(key, value):
+    if key in ALTERNATIVE_FIELDS:
+        return value.split(',')
+    return [value]
+
+
+def columnar_plan(catalog, filters):
+    column_filters = []
+    residual = []
+    for key, value in filters:
+        if key in catalog.columns:
+            column_filters.append((key, alternatives(key, value)))
+        else:
+            residual.append((key, value))
+    return column_filters, residual
+
+
+def plan(store, filters):
+    # splits filters into bitmap lookups (comma separated values are OR-ed),
+    # hash index candidate sets and residual checks for unindexed fields
+    bitmaps = []
+    candidate_sets = []
+    residual = []
+    for key, value in filters:
+        index = store.secondary_indexes.get(key)
+        if isinstance(index, BitmapIndex):
+            bitmaps.append(index.lookup_any(alternatives(key, value)))
+        elif index is not None:
+            candidate_sets.append(index.lookup(value))
+        else:
+            residual.append((key, value))
+
+    bitmap = None
+    if bitmaps:
+        bitmaps.sort(key=len)
+        bitmap = bitmaps[0]
+        for other in bitmaps[1:]:
+            bitmap = bitmap & other
+
+    candidates = None
+    if candidate_sets:
+        candidate_sets.sort(key=len)
+        candidates = set(candidate_sets[0])
+        for ordinals in candidate_sets[1:]:
+            if not candidates:
+                break
+            candidates &= ordinals
+        if bitmap is not None:
+            candidates = {ordinal for ordinal in candidates if ordinal in bitmap}
+
+    return bitmap, candidates, residual
+
+
+def planned_ordinals(store, filters):
+    # index lookups run under the store lock, since the indexes change in
+    # place; the ordinals come back as a list so the books can be read after
+    # the lock is released
+    with store.lock:
+        bitmap, candidates, residual = plan(store, filters)
+        if candidates is not None:
+            return sorted(candidates), residual
+        if bitmap is not None:
+            return list(bitmap), residual
+        return None, residual
+
+
+def query_books(store, filters):
+    # filters is a list of (field, value) pairs that must all match; indexed
+    # fields are resolved smallest candidate set first and intersected, the
+    # remaining fields are checked on the surviving books only
+    catalog = store.columnar_catalog
+    if catalog is not None:
+        column_filters, residual = columnar_plan(catalog, filters)
+        ordinals = catalog.ordinals(column_filters)
+    else:
+        ordinals, residual = planned_ordinals(store, filters)
+
+    if ordinals is None:
+        books = store.all_books()
+    else:
+        # a book deleted since planning is skipped
+        books = [book for book in map(store.books_by_ordinal.get, ordinals) if book is not None]
+
+    return [book for book in books if all(matches(book, key, value) for key, value in residual)]
+
+
+def count_books(store, filters):
+    catalog = store.columnar_catalog
+    if catalog is not None:
+        column_filters, residual = columnar_plan(catalog, filters)
+        if not residual:
+            return catalog.count(column_filters)
+        return len(query_books(store, filters))
+
+    with store.lock:
+        bitmap, candidates, residual = plan(store, filters)
+        if not residual:
+            if candidates is not None:
+                return len(candidates)
+            if bitmap is not None:
+                return len(bitmap)
+            return len(store.books)
+    return len(query_books(store, filters))
+
+
+def top_ratings(store, min_count, groups):
+    catalog = store.columnar_catalog
+    if catalog is not None:
+        books = [store.books_by_ordinal.get(ordinal) for ordinal in catalog.top_rated(min_count, groups)]
+        ratings = [store.ratings.get(book.id) for book in books if book is not None]
+        return [rating for rating in ratings if rating is not None]
+
+    rating_groups = defaultdict(list)
+    for rating in store.all_ratings():
+        if len(rating.values) >= min_count:
+            rating_groups[rating.average].append(rating)
+
+    result = []
+    for average in sorted(rating_groups.keys(), reverse=True)[:groups]:
+        result.extend(rating_groups[average])
+    return result
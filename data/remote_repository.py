@@ -0,0 +1,142 @@
+import mmap
+import os
+import socket
+import threading
+from data.repository import DuplicateIsbnError, Repository
+from data.store_protocol import VERSION, StoreError, book_from_wire, book_to_wire, rating_from_wire, rating_to_wire, receive_message, send_message
+
+MISSING = object()
+
+# operations that are safe to send twice
+READ_OPERATIONS = {"find_book", "find_book_by_isbn", "find_rating", "all_books", "all_ratings", "query_books", "count_books", "top_ratings", "stats"}
+
+
+class RemoteRepository(Repository):
+    # a worker's view of the catalog held by the store server; reads are
+    # cached locally and the whole cache is dropped whenever the server's
+    # shared version counter moves, so a cached read costs a dict lookup and
+    # an 8-byte read of the mapped counter
+    def __init__(self, socket_path, cache_max_size):
+        self.socket_path = socket_path
+        self.cache_max_size = cache_max_size
+        self.local = threading.local()
+        self.cache_lock = threading.Lock()
+        self.cache = {}
+        self.cache_version = None
+        self.version_map = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(self.socket_path)
+            self.local.connection = connection
+        return connection
+
+    def call(self, op, *args):
+        # one retry on a fresh connection covers a restarted server: a stale
+        # connection fails on send, before the server saw the request. A
+        # failure while waiting for the reply is only retried for reads,
+        # since a write may already have been applied
+        for attempt in range(2):
+            sent = False
+            try:
+                connection = self.connection()
+                send_message(connection, [op, list(args)])
+                sent = True
+                reply = receive_message(connection)
+                break
+            except (ConnectionError, OSError):
+                self.local.connection = None
+                if attempt or (sent and op not in READ_OPERATIONS):
+                    raise
+        if "duplicate_isbn" in reply:
+            raise DuplicateIsbnError(reply["duplicate_isbn"])
+        if "error" in reply:
+            raise StoreError(reply["error"])
+        return reply["result"]
+
+    def version(self):
+        if self.version_map is None:
+            with open(self.socket_path + ".version", "rb") as version_file:
+                self.version_map = mmap.mmap(version_file.fileno(), VERSION.size, access=mmap.ACCESS_READ)
+        return VERSION.unpack_from(self.version_map)[0]
+
+    def cached(self, key, fetch, *args):
+        # the version is read before fetching, so a write that lands during
+        # the fetch moves the counter and the stale entry is never served
+        version = self.version()
+        with self.cache_lock:
+            if version != self.cache_version:
+                if self.cache:
+                    self.invalidations += 1
+                self.cache = {}
+                self.cache_version = version
+            value = self.cache.get(key, MISSING)
+            if value is not MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = fetch(*args)
+        with self.cache_lock:
+            if self.cache_version == version:
+                if len(self.cache) >= self.cache_max_size:
+                    self.cache = {}
+                self.cache[key] = value
+        return value
+
+    def next_id(self):
+        return self.call("next_id")
+
+    def save_book(self, book, rating):
+        self.call("save_book", book_to_wire(book), rating_to_wire(rating))
+
+    # writes return the server's new copy; cached objects are shared
+    # between threads and never changed in place
+    def update_book(self, book, fields):
+        return book_from_wire(self.call("update_book", book.id, fields))
+
+    def store_summary(self, book, title, authors, summary):
+        return book_from_wire(self.call("store_summary", book.id, title, authors, summary))
+
+    def find_book(self, book_id):
+        return self.cached(("book", book_id), lambda: book_from_wire(self.call("find_book", book_id)))
+
+    def find_book_by_isbn(self, isbn):
+        return self.cached(("isbn", isbn), lambda: book_from_wire(self.call("find_book_by_isbn", isbn)))
+
+    def find_rating(self, book_id):
+        return self.cached(("rating", book_id), lambda: rating_from_wire(self.call("find_rating", book_id)))
+
+    def add_rating_value(self, rating, value):
+        return rating_from_wire(self.call("add_rating_value", rating.id, value))
+
+    def remove_book(self, book_id):
+        return book_from_wire(self.call("remove_book", book_id))
+
+    def all_books(self):
+        return self.cached(("all_books",), lambda: [book_from_wire(book) for book in self.call("all_books")])
+
+    def all_ratings(self):
+        return self.cached(("all_ratings",), lambda: [rating_from_wire(rating) for rating in self.call("all_ratings")])
+
+    def query_books(self, filters):
+        return self.cached(("query", tuple(filters)), lambda: [book_from_wire(book) for book in self.call("query_books", filters)])
+
+    def count_books(self, filters):
+        return self.cached(("count", tuple(filters)), lambda: self.call("count_books", filters))
+
+    def top_ratings(self, min_count=3, groups=3):
+        return self.cached(("top", min_count, groups), lambda: [rating_from_wire(rating) for rating in self.call("top_ratings", min_count, groups)])
+
+    def clear(self):
+        self.call("clear")
+
+    def stats(self):
+        with self.cache_lock:
+            cache = {"entries": len(self.cache), "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+        return {"backend": "remote", "socket": self.socket_path, "pid": os.getpid(), "cache": cache, "server": self.call("stats")}
@@ -0,0 +1,70 @@
+# the storage interface the controllers use; every backend keeps the catalog
+# in insertion order and hands out increasing string ids
+
+
+class DuplicateIsbnError(Exception):
+    # raised by save_book and update_book when another book has the ISBN;
+    # backends check and write in one atomic step
+    def __init__(self, isbn):
+        super().__init__(f"A book with ISBN {isbn} already exists")
+        self.isbn = isbn
+
+
+class Repository:
+    def next_id(self):
+        raise NotImplementedError
+
+    def save_book(self, book, rating):
+        # raises DuplicateIsbnError if the ISBN is taken
+        raise NotImplementedError
+
+    def update_book(self, book, fields):
+        # persists fields and returns the updated book, None if it is gone;
+        # `book` itself may be left unchanged
+        raise NotImplementedError
+
+    def store_summary(self, book, title, authors, summary):
+        # saves a generated summary unless the title or authors changed since
+        # it was requested; returns the updated book, or None if not saved
+        raise NotImplementedError
+
+    def find_book(self, book_id):
+        raise NotImplementedError
+
+    def find_book_by_isbn(self, isbn):
+        raise NotImplementedError
+
+    def find_rating(self, book_id):
+        raise NotImplementedError
+
+    def add_rating_value(self, rating, value):
+        # persists value and returns the updated rating, None if the book is
+        # gone; `rating` itself may be left unchanged
+        raise NotImplementedError
+
+    def remove_book(self, book_id):
+        raise NotImplementedError
+
+    def all_books(self):
+        raise NotImplementedError
+
+    def all_ratings(self):
+        raise NotImplementedError
+
+    def query_books(self, filters):
+        # filters is a list of (field, value) pairs that must all match
+        raise NotImplementedError
+
+    def count_books(self, filters):
+        raise NotImplementedError
+
+    def top_ratings(self, min_count=3, groups=3):
+        # ratings of the books with the `groups` highest averages among books
+        # with at least `min_count` ratings, best average first
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
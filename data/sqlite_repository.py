@@ -0,0 +1,234 @@
+import json
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from data.indexes import index_keys
+from data.query import alternatives, matches
+from data.repository import DuplicateIsbnError, Repository
+from models.book import Book
+from models.rating import Rating
+
+# books are stored as their JSON document next to the columns that are
+# looked up or filtered on; seq keeps insertion order and rating values are
+# kept as a string of digits so a new value is appended in place
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS books (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, isbn TEXT NOT NULL, genre_key TEXT NOT NULL, document TEXT NOT NULL)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS books_id ON books (id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS books_isbn ON books (isbn)",
+    "CREATE INDEX IF NOT EXISTS books_genre ON books (genre_key)",
+    "CREATE TABLE IF NOT EXISTS book_languages (language TEXT NOT NULL, seq INTEGER NOT NULL, PRIMARY KEY (language, seq)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS book_languages_seq ON book_languages (seq)",
+    "CREATE TABLE IF NOT EXISTS ratings (id TEXT PRIMARY KEY, title TEXT, rating_values TEXT NOT NULL, total INTEGER NOT NULL, count INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID"
+]
+
+TOP_RATINGS = """
+WITH eligible AS (
+    SELECT r.id, r.title, r.rating_values, r.total, CAST(r.total AS REAL) / r.count AS average, b.seq
+    FROM ratings r JOIN books b ON b.id = r.id
+    WHERE r.count >= ?
+)
+SELECT id, title, rating_values, total FROM eligible
+WHERE average IN (SELECT DISTINCT average FROM eligible ORDER BY average DESC LIMIT ?)
+ORDER BY average DESC, seq
+"""
+
+
+def book_from_document(document):
+    return Book(**json.loads(document))
+
+
+def rating_digit(value):
+    # one character per value; anything else would corrupt the column
+    if type(value) is not int or not 0 <= value <= 9:
+        raise ValueError(f"Rating value {value!r} cannot be stored")
+    return chr(48 + value)
+
+
+def rating_from_row(row):
+    book_id, title, values, total = row
+    rating = Rating(book_id, title)
+    rating.values = array("B", (ord(digit) - 48 for digit in values))
+    rating.total = total
+    return rating
+
+
+def genre_key(book):
+    return next(iter(index_keys(book, "genre", False)))
+
+
+class SqliteRepository(Repository):
+    # the catalog in a SQLite file in WAL mode, so readers never block the
+    # writer and several processes can share it; each thread keeps its own
+    # connection, whose statement cache keeps the fixed SQL below prepared
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self.transaction() as db:
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    def connection(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, isolation_level=None, cached_statements=256)
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+            db.execute("PRAGMA busy_timeout = 5000")
+            self.local.db = db
+        return db
+
+    @contextmanager
+    def transaction(self):
+        db = self.connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def next_id(self):
+        row = self.connection().execute(
+            "INSERT INTO counters VALUES ('book_id', 1) ON CONFLICT (name) DO UPDATE SET value = value + 1 RETURNING value"
+        ).fetchone()
+        return str(row[0])
+
+    def index_languages(self, db, seq, book):
+        db.executemany("INSERT OR IGNORE INTO book_languages VALUES (?, ?)", [(language, seq) for language in index_keys(book, "language", True)])
+
+    def isbn_taken(self, db, isbn, book_id):
+        # BEGIN IMMEDIATE holds the write lock, so the check and the write
+        # that follows it are atomic
+        row = db.execute("SELECT id FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        return row is not None and row[0] != book_id
+
+    def save_book(self, book, rating):
+        with self.transaction() as db:
+            if self.isbn_taken(db, book.ISBN, None):
+                raise DuplicateIsbnError(book.ISBN)
+            seq = db.execute(
+                "INSERT INTO books (id, isbn, genre_key, document) VALUES (?, ?, ?, ?)",
+                (book.id, book.ISBN, genre_key(book), json.dumps(book.to_dict()))
+            ).lastrowid
+            self.index_languages(db, seq, book)
+            db.execute(
+                "INSERT INTO ratings VALUES (?, ?, ?, ?, ?)",
+                (rating.id, rating.title, "".join(map(rating_digit, rating.values)), rating.total, len(rating.values))
+            )
+
+    def update_book(self, book, fields):
+        # applies the fields to the stored document inside the write
+        # transaction, so concurrent updates of one book do not undo each other
+        with self.transaction() as db:
+            row = db.execute("SELECT seq, document FROM books WHERE id = ?", (book.id,)).fetchone()
+            if row is None:
+                return None
+            updated = book_from_document(row[1]).with_fields(fields)
+            if self.isbn_taken(db, updated.ISBN, updated.id):
+                raise DuplicateIsbnError(updated.ISBN)
+            db.execute(
+                "UPDATE books SET isbn = ?, genre_key = ?, document = ? WHERE seq = ?",
+                (updated.ISBN, genre_key(updated), json.dumps(updated.to_dict()), row[0])
+            )
+            db.execute("DELETE FROM book_languages WHERE seq = ?", (row[0],))
+            self.index_languages(db, row[0], updated)
+        return updated
+
+    def store_summary(self, book, title, authors, summary):
+        with self.transaction() as db:
+            row = db.execute("SELECT document FROM books WHERE id = ?", (book.id,)).fetchone()
+            if row is None:
+                return None
+            document = json.loads(row[0])
+            if document["title"] != title or document["authors"] != authors:
+                return None
+            document["summary"] = summary
+            db.execute("UPDATE books SET document = ? WHERE id = ?", (json.dumps(document), book.id))
+        return Book(**document)
+
+    def find_book(self, book_id):
+        row = self.connection().execute("SELECT document FROM books WHERE id = ?", (book_id,)).fetchone()
+        return book_from_document(row[0]) if row else None
+
+    def find_book_by_isbn(self, isbn):
+        row = self.connection().execute("SELECT document FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        return book_from_document(row[0]) if row else None
+
+    def find_rating(self, book_id):
+        row = self.connection().execute("SELECT id, title, rating_values, total FROM ratings WHERE id = ?", (book_id,)).fetchone()
+        return rating_from_row(row) if row else None
+
+    def add_rating_value(self, rating, value):
+        # the append happens in SQL, so concurrent ratings of one book all land
+        row = self.connection().execute(
+            "UPDATE ratings SET rating_values = rating_values || ?, total = total + ?, count = count + 1 WHERE id = ? RETURNING id, title, rating_values, total",
+            (rating_digit(value), value, rating.id)
+        ).fetchone()
+        return rating_from_row(row) if row else None
+
+    def remove_book(self, book_id):
+        with self.transaction() as db:
+            row = db.execute("DELETE FROM books WHERE id = ? RETURNING seq, document", (book_id,)).fetchone()
+            if row is None:
+                return None
+            db.execute("DELETE FROM book_languages WHERE seq = ?", (row[0],))
+            db.execute("DELETE FROM ratings WHERE id = ?", (book_id,))
+        return book_from_document(row[1])
+
+    def all_books(self):
+        return [book_from_document(row[0]) for row in self.connection().execute("SELECT document FROM books ORDER BY seq")]
+
+    def all_ratings(self):
+        rows = self.connection().execute(
+            "SELECT r.id, r.title, r.rating_values, r.total FROM ratings r JOIN books b ON b.id = r.id ORDER BY b.seq"
+        )
+        return [rating_from_row(row) for row in rows]
+
+    def where(self, filters):
+        # genre and language are answered by their indexes, the remaining
+        # fields are checked on the loaded books
+        conditions = []
+        params = []
+        residual = []
+        for key, value in filters:
+            if key == "genre":
+                values = [value.lower() for value in alternatives(key, value)]
+                conditions.append(f"genre_key IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            elif key == "language":
+                values = [value.lower() for value in alternatives(key, value)]
+                conditions.append(f"seq IN (SELECT seq FROM book_languages WHERE language IN ({', '.join('?' * len(values))}))")
+                params.extend(values)
+            else:
+                residual.append((key, value))
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params, residual
+
+    def query_books(self, filters):
+        where, params, residual = self.where(filters)
+        rows = self.connection().execute(f"SELECT document FROM books{where} ORDER BY seq", params)
+        books = [book_from_document(row[0]) for row in rows]
+        return [book for book in books if all(matches(book, key, value) for key, value in residual)]
+
+    def count_books(self, filters):
+        where, params, residual = self.where(filters)
+        if residual:
+            return len(self.query_books(filters))
+        return self.connection().execute(f"SELECT COUNT(*) FROM books{where}", params).fetchone()[0]
+
+    def top_ratings(self, min_count=3, groups=3):
+        return [rating_from_row(row) for row in self.connection().execute(TOP_RATINGS, (min_count, groups))]
+
+    def clear(self):
+        with self.transaction() as db:
+            for table in ("books", "book_languages", "ratings", "counters"):
+                db.execute(f"DELETE FROM {table}")
+
+    def stats(self):
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "books": self.connection().execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        }
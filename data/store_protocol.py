@@ -0,0 +1,59 @@
+import json
+import struct
+from array import array
+from models.book import Book
+from models.rating import Rating
+
+# store server messages are length-prefixed JSON: requests are [op, args],
+# replies {"result": ...} or {"error": ...}; a DuplicateIsbnError also sends
+# {"duplicate_isbn": isbn} so the worker can raise it again
+LENGTH = struct.Struct("<I")
+# the version counter the server bumps after every write
+VERSION = struct.Struct("<Q")
+
+
+class StoreError(Exception):
+    pass
+
+
+def receive_exactly(connection, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("store connection closed")
+        data += chunk
+    return data
+
+
+def send_message(connection, message):
+    data = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    connection.sendall(LENGTH.pack(len(data)) + data)
+
+
+def receive_message(connection):
+    size = LENGTH.unpack(receive_exactly(connection, LENGTH.size))[0]
+    return json.loads(receive_exactly(connection, size))
+
+
+def book_to_wire(book):
+    return book.to_dict() if book is not None else None
+
+
+def book_from_wire(document):
+    return Book(**document) if document is not None else None
+
+
+def rating_to_wire(rating):
+    if rating is None:
+        return None
+    return {"id": rating.id, "title": rating.title, "values": rating.values.tolist()}
+
+
+def rating_from_wire(document):
+    if document is None:
+        return None
+    rating = Rating(document["id"], document["title"])
+    rating.values = array("B", document["values"])
+    rating.total = sum(rating.values)
+    return rating
@@ -0,0 +1,131 @@
+import mmap
+import os
+import socketserver
+import threading
+import time
+from data.repository import DuplicateIsbnError
+from data.store_protocol import VERSION, StoreError, book_from_wire, book_to_wire, rating_from_wire, rating_to_wire, receive_message, send_message
+
+
+class StoreRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                op, args = receive_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                reply = {"result": self.server.store.dispatch(op, args)}
+            except DuplicateIsbnError as e:
+                reply = {"error": str(e), "duplicate_isbn": e.isbn}
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            send_message(self.request, reply)
+
+
+class UnixStoreServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class StoreServer:
+    # owns the one copy of the catalog for every worker process on the host;
+    # workers talk to it over a Unix socket and watch a memory-mapped version
+    # counter, bumped after every write, to invalidate their read caches
+    def __init__(self, repository, socket_path):
+        self.repository = repository
+        self.socket_path = socket_path
+        # connections are served concurrently: the repository does its own
+        # locking, this lock only guards the counters and the version
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.writes = 0
+
+        self.version_fd = os.open(socket_path + ".version", os.O_RDWR | os.O_CREAT, 0o644)
+        os.ftruncate(self.version_fd, VERSION.size)
+        self.version_map = mmap.mmap(self.version_fd, VERSION.size)
+        # a restarted server must not reuse versions clients have cached
+        self.version = time.time_ns()
+        VERSION.pack_into(self.version_map, 0, self.version)
+
+        self.handlers = {
+            "next_id": self.next_id,
+            "save_book": self.save_book,
+            "update_book": self.update_book,
+            "store_summary": self.store_summary,
+            "find_book": lambda book_id: book_to_wire(self.repository.find_book(book_id)),
+            "find_book_by_isbn": lambda isbn: book_to_wire(self.repository.find_book_by_isbn(isbn)),
+            "find_rating": lambda book_id: rating_to_wire(self.repository.find_rating(book_id)),
+            "add_rating_value": self.add_rating_value,
+            "remove_book": self.remove_book,
+            "all_books": lambda: [book_to_wire(book) for book in self.repository.all_books()],
+            "all_ratings": lambda: [rating_to_wire(rating) for rating in self.repository.all_ratings()],
+            "query_books": lambda filters: [book_to_wire(book) for book in self.repository.query_books([tuple(pair) for pair in filters])],
+            "count_books": lambda filters: self.repository.count_books([tuple(pair) for pair in filters]),
+            "top_ratings": lambda min_count, groups: [rating_to_wire(rating) for rating in self.repository.top_ratings(min_count, groups)],
+            "clear": self.clear,
+            "stats": self.stats
+        }
+
+    def dispatch(self, op, args):
+        handler = self.handlers.get(op)
+        if handler is None:
+            raise StoreError(f"Unknown store operation {op!r}")
+        with self.lock:
+            self.requests += 1
+        return handler(*args)
+
+    def bump_version(self):
+        with self.lock:
+            self.writes += 1
+            self.version += 1
+            VERSION.pack_into(self.version_map, 0, self.version)
+
+    def next_id(self):
+        return self.repository.next_id()
+
+    def save_book(self, book, rating):
+        self.repository.save_book(book_from_wire(book), rating_from_wire(rating))
+        self.bump_version()
+
+    def update_book(self, book_id, fields):
+        book = self.repository.find_book(book_id)
+        updated = self.repository.update_book(book, fields) if book is not None else None
+        if updated is not None:
+            self.bump_version()
+        return book_to_wire(updated)
+
+    def store_summary(self, book_id, title, authors, summary):
+        book = self.repository.find_book(book_id)
+        updated = self.repository.store_summary(book, title, authors, summary) if book is not None else None
+        if updated is not None:
+            self.bump_version()
+        return book_to_wire(updated)
+
+    def add_rating_value(self, book_id, value):
+        rating = self.repository.find_rating(book_id)
+        updated = self.repository.add_rating_value(rating, value) if rating is not None else None
+        if updated is not None:
+            self.bump_version()
+        return rating_to_wire(updated)
+
+    def remove_book(self, book_id):
+        book = self.repository.remove_book(book_id)
+        if book is not None:
+            self.bump_version()
+        return book_to_wire(book)
+
+    def clear(self):
+        self.repository.clear()
+        self.bump_version()
+
+    def stats(self):
+        with self.lock:
+            counters = {"requests": self.requests, "writes": self.writes, "version": self.version}
+        return dict(counters, repository=self.repository.stats())
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        with UnixStoreServer(self.socket_path, StoreRequestHandler) as server:
+            server.store = self
+            server.serve_forever()
@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+import time
+
+SEGMENT_NAME = "wal-{:08d}.log"
+
+
+def segment_number(name):
+    # wal-00000012.log -> 12, None for other files
+    if name.startswith("wal-") and name.endswith(".log"):
+        try:
+            return int(name[4:-4])
+        except ValueError:
+            return None
+    return None
+
+
+def read_segment(path):
+    # yields the records of one segment; a torn last line left by a crash
+    # ends the segment
+    with open(path, "rb") as segment:
+        for line in segment:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+
+class WriteAheadLogError(Exception):
+    pass
+
+
+class WriteAheadLog:
+    # append-only JSON lines split into numbered segments; appends from many
+    # threads are written and fsynced together by one flusher thread (group
+    # commit) and a writer only waits for the fsync that covers its record
+    def __init__(self, directory, segment, commit_interval):
+        self.directory = directory
+        self.segment = segment
+        self.commit_interval = commit_interval
+        self.file = open(os.path.join(directory, SEGMENT_NAME.format(segment)), "ab")
+        self.condition = threading.Condition()
+        # None in pending marks a switch to the next segment
+        self.pending = []
+        self.appended = 0
+        self.durable = 0
+        self.records_in_segment = 0
+        self.commits = 0
+        self.records = 0
+        self.commit_seconds = 0.0
+        # the OSError that stopped the flusher; the log accepts no more records
+        self.error = None
+        self.flusher = threading.Thread(target=self.run, daemon=True)
+        self.flusher.start()
+
+    def enqueue(self, record):
+        # returns the sequence number to wait for; callers enqueue while
+        # holding their own write lock so the log keeps their order
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self.condition:
+            self.check()
+            self.pending.append(line)
+            self.appended += 1
+            self.records_in_segment += 1
+            self.condition.notify_all()
+            return self.appended
+
+    def wait(self, sequence):
+        with self.condition:
+            while self.durable < sequence:
+                self.check()
+                self.condition.wait()
+
+    def check(self):
+        if self.error is not None:
+            raise WriteAheadLogError(f"Write-ahead log failed: {self.error}") from self.error
+
+    def append(self, record):
+        self.wait(self.enqueue(record))
+
+    def rotate(self):
+        # starts a new segment; records enqueued afterwards go to it
+        with self.condition:
+            self.check()
+            self.segment += 1
+            self.records_in_segment = 0
+            self.pending.append(None)
+            self.condition.notify_all()
+            return self.segment
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            # a short pause lets concurrent writers join this commit
+            if self.commit_interval:
+                time.sleep(self.commit_interval)
+            with self.condition:
+                batch, self.pending = self.pending, []
+                last = self.appended
+
+            start = time.perf_counter()
+            try:
+                self.write(batch)
+            except OSError as e:
+                # a full disk or I/O error: waiting writers and later
+                # appends fail instead of blocking forever
+                with self.condition:
+                    self.error = e
+                    self.condition.notify_all()
+                return
+
+            with self.condition:
+                self.durable = last
+                self.commits += 1
+                self.records += sum(1 for line in batch if line is not None)
+                self.commit_seconds += time.perf_counter() - start
+                self.condition.notify_all()
+
+    def write(self, batch):
+        segment = self.file
+        for line in batch:
+            if line is None:
+                segment.flush()
+                os.fsync(segment.fileno())
+                segment.close()
+                next_number = segment_number(os.path.basename(segment.name)) + 1
+                segment = open(os.path.join(self.directory, SEGMENT_NAME.format(next_number)), "ab")
+                self.file = segment
+            else:
+                segment.write(line)
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    def stats(self):
+        with self.condition:
+            return {
+                "segment": self.segment,
+                "records_in_segment": self.records_in_segment,
+                "records": self.records,
+                "commits": self.commits,
+                "avg_records_per_commit": self.records / self.commits if self.commits else 0.0,
+                "avg_commit_ms": self.commit_seconds / self.commits * 1000 if self.commits else 0.0,
+                "pending": len(self.pending),
+                "error": str(self.error) if self.error is not None else None
+            }
@@ -1,4 +1,27 @@
+import sys
+
+# summary placeholder for books whose summary is generated on first read
+PENDING_SUMMARY = "pending"
+
+# low-cardinality fields whose strings are interned so every book with the
+# same genre, publisher or language list shares one object
+INTERNED_FIELDS = {"genre", "publisher", "language"}
+language_lists = {}
+
+
+def intern_field(value):
+    # language lists are stored as shared tuples of interned codes
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, (list, tuple)) and all(isinstance(element, str) for element in value):
+        languages = tuple(sys.intern(element) for element in value)
+        return language_lists.setdefault(languages, languages)
+    return value
+
+
 class Book:
+    __slots__ = ("id", "ISBN", "title", "genre", "authors", "publisher", "publishedDate", "language", "summary")
+
     def __init__(self, id, ISBN, title, genre, authors, publisher, publishedDate, language, summary):
         self.id = id
         self.ISBN = ISBN
@@ -10,6 +33,16 @@ class Book:
         self.language = language
         self.summary = summary
 
+    def __setattr__(self, name, value):
+        if name in INTERNED_FIELDS:
+            value = intern_field(value)
+        object.__setattr__(self, name, value)
+
+    def with_fields(self, fields):
+        # a new book with `fields` replaced; stored books are never changed
+        # in place, so readers can use them without locking
+        return Book(**dict(self.to_dict(), **fields))
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -19,6 +52,6 @@ class Book:
             "authors": self.authors,
             "publisher": self.publisher,
             "publishedDate": self.publishedDate,
-            "language": self.language,
+            "language": list(self.language) if isinstance(self.language, tuple) else self.language,
             "summary": self.summary
-        }
\ No newline at end of file
+        }
@@ -1,18 +1,36 @@
+from array import array
+
+
 class Rating:
+    # values are 1-5, so they are kept one byte each next to a running total
+    __slots__ = ("id", "title", "values", "total")
+
     def __init__(self, id, title):
         self.id = id
         self.title = title
-        self.values = []
-        self.average = 0.0
+        self.values = array("B")
+        self.total = 0
+
+    @property
+    def average(self):
+        return self.total / len(self.values) if self.values else 0.0
 
     def add_value(self, value):
         self.values.append(value)
-        self.average = sum(self.values) / len(self.values) if self.values else 0
+        self.total += value
+
+    def with_value(self, value):
+        # a new rating with `value` added, for copy-on-write stores
+        rating = Rating(self.id, self.title)
+        rating.values = array("B", self.values)
+        rating.values.append(value)
+        rating.total = self.total + value
+        return rating
 
     def to_dict(self):
         return {
             "id": self.id,
             "title": self.title,
-            "values": self.values,
+            "values": self.values.tolist(),
             "average": self.average
         }
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
-from controllers.books_controller import add_book, get_book, get_books, update_book, delete_book
+import config
+from controllers.books_controller import add_book, add_books_batch, get_book, get_book_by_isbn, refresh_book_summary, get_books, count_matching_books, update_book, delete_book
 
 book_routes = Blueprint('book_routes', __name__)
 
@@ -11,16 +12,39 @@ def route_add_book():
         data = request.get_json()
     except:
         return jsonify({"error": "Invalid JSON data"}), 422
-    return add_book(data)
+    run_async = request.args.get('async', str(config.ASYNC_INGESTION)).lower() == 'true'
+    return add_book(data, run_async)
+
+@book_routes.route('/books:batch', methods=['POST'])
+def route_add_books_batch():
+    if request.content_type != 'application/json':
+        return jsonify({"error": "Unsupported media type"}), 415
+    try:
+        data = request.get_json()
+    except:
+        return jsonify({"error": "Invalid JSON data"}), 422
+    return add_books_batch(data)
 
 @book_routes.route('/books/<book_id>', methods=['GET'])
 def route_get_book(book_id):
     return get_book(book_id)
 
+@book_routes.route('/books/isbn/<isbn>', methods=['GET'])
+def route_get_book_by_isbn(isbn):
+    return get_book_by_isbn(isbn)
+
+@book_routes.route('/books/<book_id>/summary', methods=['POST'])
+def route_refresh_book_summary(book_id):
+    return refresh_book_summary(book_id)
+
 @book_routes.route('/books', methods=['GET'])
 def route_get_books():
     return get_books(request.args) 
 
+@book_routes.route('/books:count', methods=['GET'])
+def route_count_books():
+    return count_matching_books(request.args)
+
 @book_routes.route('/books/<book_id>', methods=['PUT'])
 def route_update_book(book_id):
     if request.content_type != 'application/json':
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from controllers.jobs_controller import get_job
+
+job_routes = Blueprint('job_routes', __name__)
+
+@job_routes.route('/jobs/<job_id>', methods=['GET'])
+def route_get_job(job_id):
+    return get_job(job_id)
@@ -1,4 +1,3 @@
-from data.database import ratings
 from flask import Blueprint, app, jsonify, request
 from controllers.ratings_controller import get_ratings, get_book_ratings, add_rating, get_top_books
 
@@ -26,6 +25,6 @@ def route_add_rating(book_id):
 @rating_routes.route('/top', methods=['GET'])
 def top_books():
     try:
-        return get_top_books(ratings)
+        return get_top_books()
     except Exception as e:
         return jsonify({'error': 'Internal Server Error', 'message': str(e)}), 500
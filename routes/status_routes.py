@@ -0,0 +1,8 @@
+from flask import Blueprint
+from controllers.status_controller import get_status
+
+status_routes = Blueprint('status_routes', __name__)
+
+@status_routes.route('/status', methods=['GET'])
+def route_get_status():
+    return get_status()
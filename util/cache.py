@@ -0,0 +1,100 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    # in-memory LRU with a TTL, optionally mirrored to a SQLite file so entries
+    # survive restarts; values must be JSON serializable when a path is given
+    def __init__(self, max_size, ttl=None, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires_at REAL, stored_at REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)")
+            self.db.commit()
+            self.load()
+
+    def load(self):
+        now = time.time()
+        self.db.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        rows = self.db.execute("SELECT key, value, expires_at FROM entries ORDER BY stored_at DESC LIMIT ?", (self.max_size,)).fetchall()
+        for key, value, expires_at in reversed(rows):
+            self.entries[key] = (expires_at, json.loads(value))
+        self.db.execute("DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY stored_at DESC LIMIT ?)", (self.max_size,))
+        self.db.commit()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                self.discard(key)
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            if self.db:
+                self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, json.dumps(value), expires_at, time.time()))
+
+            while len(self.entries) > self.max_size:
+                oldest, _ = self.entries.popitem(last=False)
+                self.evictions += 1
+                if self.db:
+                    self.db.execute("DELETE FROM entries WHERE key = ?", (oldest,))
+
+            if self.db:
+                self.db.commit()
+
+    def remove(self, key):
+        with self.lock:
+            self.discard(key)
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+        if self.db:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db:
+                self.db.execute("DELETE FROM entries")
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "persistent": self.db is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
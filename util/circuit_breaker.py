@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import deque
+from util.http_client import percentile
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name):
+        super().__init__(f"Circuit breaker for {name} is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    # trips when the failure rate or the slow call rate over the last
+    # `window_size` calls crosses its threshold, rejects calls while open and
+    # lets a single probe through once `open_seconds` have passed
+    def __init__(self, name, failure_rate_threshold, slow_call_ms, slow_call_rate_threshold,
+                 window_size, min_calls, open_seconds):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.window = deque(maxlen=window_size)
+        self.latencies = deque(maxlen=500)
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def call(self, fn, *args):
+        self.before_call()
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.after_call((time.perf_counter() - start) * 1000, failed=True)
+            raise
+        self.after_call((time.perf_counter() - start) * 1000, failed=False)
+        return result
+
+    def before_call(self):
+        with self.lock:
+            if self.state == "open":
+                if time.time() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name)
+                self.state = "half_open"
+
+            if self.state == "half_open":
+                if self.probe_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name)
+                self.probe_in_flight = True
+
+    def after_call(self, latency_ms, failed):
+        slow = latency_ms >= self.slow_call_ms
+        with self.lock:
+            self.calls += 1
+            self.failures += failed
+            self.latencies.append(latency_ms)
+
+            if self.state == "half_open":
+                self.probe_in_flight = False
+                if failed or slow:
+                    self.trip()
+                else:
+                    self.state = "closed"
+                    self.window.clear()
+                return
+
+            self.window.append((failed, slow))
+            if self.state == "closed" and len(self.window) >= self.min_calls:
+                failure_rate = sum(1 for f, _ in self.window if f) / len(self.window)
+                slow_rate = sum(1 for _, s in self.window if s) / len(self.window)
+                if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                    self.trip()
+
+    def trip(self):
+        self.state = "open"
+        self.opened_at = time.time()
+        self.trips += 1
+        self.window.clear()
+
+    def p95(self, min_samples=20):
+        with self.lock:
+            if len(self.latencies) < min_samples:
+                return None
+            return percentile(self.latencies, 0.95)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "window_failures": sum(1 for f, _ in self.window if f),
+                "window_slow_calls": sum(1 for _, s in self.window if s),
+                "window_size": len(self.window),
+                "p95_ms": percentile(self.latencies, 0.95)
+            }
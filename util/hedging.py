@@ -0,0 +1,50 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import config
+
+hedge_executor = ThreadPoolExecutor(max_workers=config.HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+class HedgeStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, hedged, hedge_won):
+        with self.lock:
+            self.calls += 1
+            self.hedged += hedged
+            self.hedge_wins += hedge_won
+
+    def stats(self):
+        with self.lock:
+            return {"calls": self.calls, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+
+hedge_stats = HedgeStats()
+
+
+def hedged_call(delay_ms, fn, *args):
+    # sends a second attempt when the first has not answered within delay_ms
+    # and returns whichever attempt succeeds first
+    first = hedge_executor.submit(fn, *args)
+    done, _ = wait([first], timeout=delay_ms / 1000)
+    if done:
+        hedge_stats.record(hedged=False, hedge_won=False)
+        return first.result()
+
+    second = hedge_executor.submit(fn, *args)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                hedge_stats.record(hedged=True, hedge_won=future is second)
+                return future.result()
+            error = error or future.exception()
+
+    hedge_stats.record(hedged=True, hedge_won=False)
+    raise error
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import config
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class HostMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=500)
+
+    def record(self, latency_ms, failed):
+        with self.lock:
+            self.requests += 1
+            if failed:
+                self.errors += 1
+            self.latencies.append(latency_ms)
+
+    def record_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def p95(self):
+        with self.lock:
+            return percentile(self.latencies, 0.95)
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "avg_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50_ms": percentile(latencies, 0.5),
+                "p95_ms": percentile(latencies, 0.95),
+                "max_ms": max(latencies) if latencies else 0.0
+            }
+
+
+class RetryBudget:
+    # every request deposits `ratio` of a token and every retry spends a whole
+    # one, so retries stay a bounded fraction of traffic during an outage
+    def __init__(self, ratio, max_tokens):
+        self.lock = threading.Lock()
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.exhausted = 0
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {"tokens": self.tokens, "exhausted": self.exhausted}
+
+
+class HttpClient:
+    # one keep-alive session shared by all outbound catalog lookups; requests
+    # keeps a connection pool per host behind the mounted adapter
+    def __init__(self, pool_size, connect_timeout, read_timeout, max_retries, backoff, retry_budget_ratio):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retry_budget = RetryBudget(retry_budget_ratio, max_tokens=10)
+        self.metrics_lock = threading.Lock()
+        self.metrics = {}
+
+    def host_metrics(self, host):
+        with self.metrics_lock:
+            if host not in self.metrics:
+                self.metrics[host] = HostMetrics()
+            return self.metrics[host]
+
+    def get(self, url, **kwargs):
+        host = urlsplit(url).hostname
+        metrics = self.host_metrics(host)
+        kwargs.setdefault("timeout", self.timeout)
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                metrics.record((time.perf_counter() - start) * 1000, failed=True)
+                if not self.should_retry(attempt, metrics):
+                    raise
+            else:
+                failed = response.status_code in RETRYABLE_STATUS_CODES
+                metrics.record((time.perf_counter() - start) * 1000, failed=failed)
+                if not failed or not self.should_retry(attempt, metrics):
+                    return response
+
+            # full jitter exponential backoff
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+            attempt += 1
+
+    def should_retry(self, attempt, metrics):
+        if attempt >= self.max_retries or not self.retry_budget.withdraw():
+            return False
+        metrics.record_retry()
+        return True
+
+    def stats(self):
+        with self.metrics_lock:
+            hosts = dict(self.metrics)
+        return {
+            "retry_budget": self.retry_budget.stats(),
+            "hosts": {host: metrics.stats() for host, metrics in hosts.items()}
+        }
+
+
+http_client = HttpClient(
+    pool_size=config.HTTP_POOL_SIZE,
+    connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+    read_timeout=config.HTTP_READ_TIMEOUT,
+    max_retries=config.HTTP_MAX_RETRIES,
+    backoff=config.HTTP_BACKOFF,
+    retry_budget_ratio=config.HTTP_RETRY_BUDGET_RATIO
+)
@@ -0,0 +1,2 @@
+def normalize_isbn(isbn):
+    return str(isbn).replace("-", "").replace(" ", "").strip().upper()
@@ -0,0 +1,124 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+# tokens, last refill time, processes/threads currently queued
+STATE = struct.Struct("ddq")
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, name):
+        super().__init__(f"Rate limit for {name} exceeded")
+        self.name = name
+
+
+class SharedTokenBucket:
+    # token bucket whose state lives in a small memory-mapped file guarded by
+    # flock, so every worker process on the host draws from the same quota
+    def __init__(self, name, rate, burst, path):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.thread_lock = threading.Lock()
+        self.metrics_lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.local_waiting = 0
+
+        with self.locked():
+            if os.fstat(self.fd).st_size < STATE.size:
+                os.ftruncate(self.fd, STATE.size)
+            self.state = mmap.mmap(self.fd, STATE.size)
+            tokens, updated_at, waiting = STATE.unpack_from(self.state)
+            if updated_at == 0:
+                STATE.pack_into(self.state, 0, float(burst), time.time(), 0)
+
+    @contextmanager
+    def locked(self):
+        # flock is per open file, so threads of one process also need a lock
+        with self.thread_lock:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def try_take(self, waiting_delta=0):
+        # returns 0 when a token was taken, otherwise the seconds until the
+        # next token is due
+        with self.locked():
+            tokens, updated_at, waiting = STATE.unpack_from(self.state)
+            now = time.time()
+            tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+            waiting += waiting_delta
+            if tokens >= 1:
+                STATE.pack_into(self.state, 0, tokens - 1, now, waiting)
+                return 0
+            STATE.pack_into(self.state, 0, tokens, now, waiting)
+            return (1 - tokens) / self.rate
+
+    def leave_queue(self):
+        with self.locked():
+            tokens, updated_at, waiting = STATE.unpack_from(self.state)
+            STATE.pack_into(self.state, 0, tokens, updated_at, max(0, waiting - 1))
+
+    def acquire(self, max_wait):
+        # queues for up to max_wait seconds instead of failing right away
+        wait = self.try_take()
+        if not wait:
+            self.record(0.0)
+            return
+
+        start = time.time()
+        deadline = start + max_wait
+        with self.metrics_lock:
+            self.local_waiting += 1
+        wait = self.try_take(waiting_delta=1)
+        try:
+            while wait:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    with self.metrics_lock:
+                        self.rejected += 1
+                    raise RateLimitExceeded(self.name)
+                time.sleep(min(wait, remaining))
+                wait = self.try_take()
+        finally:
+            self.leave_queue()
+            with self.metrics_lock:
+                self.local_waiting -= 1
+
+        self.record(time.time() - start)
+
+    def record(self, wait):
+        with self.metrics_lock:
+            self.acquired += 1
+            if wait:
+                self.waited += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+    def stats(self):
+        with self.locked():
+            tokens, _, waiting = STATE.unpack_from(self.state)
+        with self.metrics_lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": tokens,
+                "queue_depth": waiting,
+                "local_queue_depth": self.local_waiting,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "rejected": self.rejected,
+                "avg_wait_ms": self.total_wait / self.waited * 1000 if self.waited else 0.0,
+                "max_wait_ms": self.max_wait * 1000
+            }
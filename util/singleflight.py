@@ -0,0 +1,57 @@
+import threading
+
+
+class Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    # concurrent calls for the same key share one execution of fn; every
+    # caller gets the same result or the same exception
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = Call()
+                self.calls[key] = call
+                self.executions += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self):
+        with self.lock:
+            return {
+                "in_flight": len(self.calls),
+                "executions": self.executions,
+                "coalesced": self.coalesced
+            }
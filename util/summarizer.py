@@ -0,0 +1,74 @@
+import json
+import threading
+import config
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_DANGEROUS", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
+]
+
+
+def summary_prompt(title, authors):
+    return f'Summarize the book "{title}" by {authors} in 5 sentences or less. If you don\'t know the book, return the word "missing" and only this word."'
+
+
+def batch_summary_prompt(books):
+    listing = "\n".join(f'{number}. "{title}" by {authors}' for number, (title, authors) in enumerate(books, 1))
+    return (
+        "Summarize each of the following books in 5 sentences or less. "
+        'If you don\'t know a book, use the word "missing" and only this word as its summary. '
+        "Answer with only a JSON array of strings, one summary per book, in the same order.\n"
+        f"{listing}"
+    )
+
+
+def parse_batch_response(text, expected):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.index("\n") + 1:] if "\n" in text else text
+    summaries = json.loads(text)
+    if not isinstance(summaries, list) or len(summaries) != expected or not all(isinstance(s, str) for s in summaries):
+        raise ValueError("Gemini batch response does not match the requested books")
+    return [summary.strip() or "missing" for summary in summaries]
+
+
+class Summarizer:
+    # process-wide Gemini client; google.generativeai and its grpc stack are
+    # imported, configured and the model built once, on first use or warmup
+    def __init__(self, model_name, api_key):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.lock = threading.Lock()
+        self.model = None
+
+    def get_model(self):
+        if self.model is None:
+            with self.lock:
+                if self.model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self.model = genai.GenerativeModel(self.model_name, safety_settings=SAFETY_SETTINGS)
+        return self.model
+
+    def warmup(self):
+        self.get_model()
+
+    def summarize(self, title, authors):
+        llm_response = self.get_model().generate_content(summary_prompt(title, authors))
+        return llm_response.text if llm_response else "missing"
+
+    def summarize_batch(self, books):
+        # one generate_content call for several (title, authors) pairs
+        if len(books) == 1:
+            return [self.summarize(*books[0])]
+        llm_response = self.get_model().generate_content(batch_summary_prompt(books))
+        if not llm_response:
+            return ["missing"] * len(books)
+        return parse_batch_response(llm_response.text, len(books))
+
+
+summarizer = Summarizer(config.GEMINI_MODEL, config.GEMINI_KEY)